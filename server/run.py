@@ -1,20 +1,68 @@
 #!/usr/bin/env python3
-"""Point d'entrée pour Railway : lit PORT depuis l'environnement et lance uvicorn."""
+"""Point d'entrée pour Railway : lit PORT depuis l'environnement et lance uvicorn.
+
+WEB_CONCURRENCY fixe le nombre de workers ; "auto" (défaut) le déduit du quota CPU du conteneur.
+SIGHUP redémarre les workers un par un (rechargement gracieux).
+"""
+import math
 import os
+import subprocess
 import sys
 import uvicorn
 
-# Mettre à jour les produits en base (dont sample_pdf_url pour les extraits) à chaque démarrage
-try:
-    from seed_products import main as run_seed
-    run_seed()
-except Exception as e:
-    print(f"Seed au démarrage (non bloquant): {e}", file=sys.stderr)
-
-port = int(os.environ.get("PORT", "8000"))
-uvicorn.run(
-    "src.main:app",
-    host="0.0.0.0",
-    port=port,
-    log_level="info",
-)
+
+def _cgroup_cpu_quota() -> float | None:
+    """Quota CPU du conteneur (cgroup v2 puis v1), en nombre de cœurs ; None si illimité."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def worker_count() -> int:
+    configured = os.environ.get("WEB_CONCURRENCY", "auto").strip().lower()
+    if configured not in ("", "auto"):
+        return max(1, int(configured))
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+
+if __name__ == "__main__":
+    # Mettre à jour les produits en base (dont sample_pdf_url pour les extraits) à chaque démarrage
+    try:
+        from seed_products import main as run_seed
+        run_seed()
+    except Exception as e:
+        print(f"Seed au démarrage (non bloquant): {e}", file=sys.stderr)
+
+    # Index manquants construits en arrière-plan (CONCURRENTLY) pendant que les workers démarrent
+    subprocess.Popen([sys.executable, "-m", "src.db.indexes"], cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    port = int(os.environ.get("PORT", "8000"))
+    workers = worker_count()
+    print(f"Démarrage uvicorn : {workers} worker(s)", file=sys.stderr)
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=port,
+        log_level="info",
+        workers=workers,
+        timeout_graceful_shutdown=int(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", "20")),
+    )
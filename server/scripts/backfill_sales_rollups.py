@@ -0,0 +1,75 @@
+"""
+Recalcule les agrégats de ventes journaliers (daily_product_sales) à partir des commandes,
+par tranches de quelques jours (une transaction courte par tranche).
+À lancer depuis server/ : python scripts/backfill_sales_rollups.py [AAAA-MM-JJ début] [AAAA-MM-JJ fin]
+Sans dates : depuis la première commande jusqu'à aujourd'hui.
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from src.db.database import Base, SessionLocal, engine  # noqa: E402
+from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.product import Product  # noqa: F401,E402
+from src.models.sales import DailyProductSales  # noqa: F401,E402
+from src.models.user import User  # noqa: F401,E402
+from src.services import sales_rollups  # noqa: E402
+
+CHUNK_DAYS = int(os.getenv("SALES_BACKFILL_CHUNK_DAYS", "7"))
+MAX_ATTEMPTS = 5
+
+
+def backfill_chunk(start: date, end: date) -> int:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        db = SessionLocal()
+        try:
+            # Instantané cohérent : une commande concurrente sur ces jours fait échouer la tranche, relancée ensuite
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            rows = sales_rollups.backfill_range(db, start, end)
+            db.commit()
+            return rows
+        except DBAPIError as e:
+            db.rollback()
+            print(f"  {start} → {end} : tentative {attempt} interrompue ({e.orig})")
+        finally:
+            db.close()
+    raise SystemExit(f"Échec de la tranche {start} → {end}")
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+
+    if len(sys.argv) >= 2:
+        start = date.fromisoformat(sys.argv[1])
+    else:
+        with SessionLocal() as db:
+            first = db.execute(select(func.min(Order.created_at))).scalar()
+        if first is None:
+            print("Aucune commande : rien à recalculer.")
+            return
+        start = first.date()
+    end = date.fromisoformat(sys.argv[2]) if len(sys.argv) >= 3 else date.today()
+
+    began = time.perf_counter()
+    total = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS - 1), end)
+        rows = backfill_chunk(chunk_start, chunk_end)
+        total += rows
+        print(f"  {chunk_start} → {chunk_end} : {rows} ligne(s)")
+        chunk_start = chunk_end + timedelta(days=1)
+    print(f"Terminé : {total} ligne(s) en {time.perf_counter() - began:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
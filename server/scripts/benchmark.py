@@ -0,0 +1,421 @@
+"""
+Micro-benchmarks en processus (sans réseau) pour mesurer le coût côté Python
+des optimisations de l'API.
+À lancer depuis server/ : python scripts/benchmark.py [scénario ...]
+Sans argument, tous les scénarios sont exécutés.
+Les scénarios qui montent l'application complète utilisent DATABASE_URL, ou à défaut
+une base SQLite temporaire.
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+
+def _catalog_payload(n: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "title": f"Ebook numéro {i}",
+            "description": "Un guide pratique pour progresser rapidement, avec exemples et exercices.",
+            "long_description": None,
+            "price_cents": 990 + i,
+            "cover_image_url": f"/static/covers/ebook-{i}.png",
+            "sample_pdf_url": None,
+            "file_key": f"ebooks/ebook-{i}.pdf",
+            "is_active": True,
+        }
+        for i in range(n)
+    ]
+
+
+def _load_app():
+    """Importe l'application complète (tables créées au passage)."""
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    from src.main import app
+
+    return app
+
+
+async def _call_asgi(
+    app,
+    path: str,
+    headers: list[tuple[bytes, bytes]],
+    method: str = "GET",
+    body: bytes = b"",
+) -> int:
+    """Appelle l'application ASGI ; renvoie la taille du corps (GET) ou le statut HTTP (autres méthodes)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    size = 0
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal size, status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size if method == "GET" else status_code
+
+
+def _report(label: str, elapsed: float, n: int, extra: str = "") -> None:
+    print(f"  {label:<44} {elapsed / n * 1e6:9.1f} µs/req {extra}")
+
+
+def bench_middleware(iterations: int = 2000) -> None:
+    """Pile BaseHTTPMiddleware (ancienne) vs ASGI pur + compression avec cache de variantes."""
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    from src.middleware.compression import CompressionMiddleware
+    from src.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    payload = _catalog_payload(50)
+
+    async def catalog(request):
+        return JSONResponse(payload)
+
+    class LegacyProxyHeadersMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            if request.headers.get("x-forwarded-proto") == "https":
+                request.scope["scheme"] = "https"
+            return await call_next(request)
+
+    routes = [Route("/products/", catalog)]
+    stacks = {
+        "BaseHTTPMiddleware (avant)": Starlette(routes=routes, middleware=[Middleware(LegacyProxyHeadersMiddleware)]),
+        "ASGI pur, sans compression": Starlette(routes=routes, middleware=[Middleware(ProxyHeadersMiddleware)]),
+        "ASGI pur + gzip, cache de variantes": Starlette(
+            routes=routes,
+            middleware=[
+                Middleware(ProxyHeadersMiddleware),
+                Middleware(CompressionMiddleware, cache_prefixes=("/products",)),
+            ],
+        ),
+        "ASGI pur + gzip, sans cache": Starlette(
+            routes=routes,
+            middleware=[Middleware(ProxyHeadersMiddleware), Middleware(CompressionMiddleware)],
+        ),
+    }
+    headers = [(b"x-forwarded-proto", b"https"), (b"accept-encoding", b"gzip")]
+
+    async def run() -> None:
+        for label, app in stacks.items():
+            await _call_asgi(app, "/products/", headers)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                size = await _call_asgi(app, "/products/", headers)
+            _report(label, time.perf_counter() - start, iterations, f"({size} octets)")
+
+    print(f"middleware — catalogue de {len(payload)} produits ({len(json.dumps(payload))} octets JSON)")
+    asyncio.run(run())
+
+
+def bench_auth_flood(attempts_per_second: int = 200, duration: float = 3.0) -> None:
+    """Latence du catalogue pendant un flot de tentatives de connexion, avec et sans limitation /auth."""
+    app = _load_app()
+    from src.services import rate_limit
+
+    json_headers = [(b"content-type", b"application/json"), (b"x-forwarded-for", b"203.0.113.7")]
+    credentials = {"email": "bench-flood@example.com", "password": "bon-mot-de-passe"}
+    attempt = json.dumps({**credentials, "password": "mauvais"}).encode()
+
+    async def sample_catalog(stop: asyncio.Event) -> list[float]:
+        latencies = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            await _call_asgi(app, "/products/", [])
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+        return sorted(latencies)
+
+    def summary(label: str, latencies: list[float], extra: str = "") -> None:
+        p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+        print(f"  {label:<20} catalogue p50 {statistics.median(latencies) * 1e3:8.2f} ms  p99 {p99 * 1e3:8.2f} ms {extra}")
+
+    async def run(label: str, limited: bool | None) -> None:
+        rate_limit.RATE_LIMIT_ENABLED = bool(limited)
+        rate_limit.auth_ip_bucket = rate_limit._make_bucket(rate_limit.AUTH_RATE_LIMIT_IP_PER_MINUTE, rate_limit.AUTH_RATE_LIMIT_IP_BURST)
+        rate_limit.auth_email_bucket = rate_limit._make_bucket(rate_limit.AUTH_RATE_LIMIT_EMAIL_PER_MINUTE, rate_limit.AUTH_RATE_LIMIT_EMAIL_BURST)
+        stop = asyncio.Event()
+        statuses: dict[int, int] = {}
+        attempts = []
+
+        async def login() -> None:
+            code = await _call_asgi(app, "/auth/login", json_headers, "POST", attempt)
+            statuses[code] = statuses.get(code, 0) + 1
+
+        sampler = asyncio.create_task(sample_catalog(stop))
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            # Charge ouverte : les tentatives arrivent à débit fixe, qu'elles aient abouti ou non
+            if limited is not None:
+                attempts.append(asyncio.create_task(login()))
+            await asyncio.sleep(1 / attempts_per_second)
+        stop.set()
+        latencies = await sampler
+        await asyncio.gather(*attempts)
+        summary(label, latencies, f"réponses login {statuses}" if statuses else "")
+
+    async def main() -> None:
+        rate_limit.RATE_LIMIT_ENABLED = False
+        await _call_asgi(app, "/auth/register", json_headers[:1], "POST", json.dumps(credentials).encode())
+        await run("au repos", None)
+        await run("sans limitation", False)
+        await run("avec limitation", True)
+
+    print(f"auth_flood — {attempts_per_second} tentatives/s sur /auth/login pendant {duration:.0f} s (même IP)")
+    asyncio.run(main())
+
+
+def bench_bulkheads(slow_calls: int = 120, samples: int = 50) -> None:
+    """Latence d'une route rapide pendant que des appels « Stripe » bloquants (2 s) saturent les threads."""
+    from fastapi import APIRouter, FastAPI
+
+    from src.services.bulkheads import bulkhead_route, bulkheads
+
+    def build(isolated: bool) -> FastAPI:
+        app = FastAPI()
+        slow = APIRouter(route_class=bulkhead_route("stripe")) if isolated else APIRouter()
+        fast = APIRouter(route_class=bulkhead_route("db")) if isolated else APIRouter()
+
+        @slow.get("/slow")
+        def slow_call() -> dict:
+            time.sleep(2)
+            return {}
+
+        @fast.get("/fast")
+        def fast_call() -> dict:
+            return {}
+
+        app.include_router(slow)
+        app.include_router(fast)
+        return app
+
+    async def run(label: str, app) -> None:
+        slow_tasks = [asyncio.create_task(_call_asgi(app, "/slow", [])) for _ in range(slow_calls)]
+        await asyncio.sleep(0.05)
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            await _call_asgi(app, "/fast", [])
+            latencies.append(time.perf_counter() - start)
+        await asyncio.gather(*slow_tasks)
+        latencies.sort()
+        print(f"  {label:<28} /fast p50 {statistics.median(latencies) * 1e3:8.2f} ms  max {latencies[-1] * 1e3:8.2f} ms")
+
+    async def main() -> None:
+        await run("pool partagé (avant)", build(isolated=False))
+        await run("cloisons stripe / db", build(isolated=True))
+        print(f"  rejets stripe (file pleine) : {bulkheads['stripe'].rejected}")
+
+    print(f"bulkheads — {slow_calls} appels lents simultanés")
+    asyncio.run(main())
+
+
+def bench_statements(iterations: int = 3000) -> None:
+    """CPU Python par requête pour les lookups chauds : db.query(...) reconstruit vs select() préconstruits."""
+    _load_app()
+    from sqlalchemy import select
+
+    from src.db import statements
+    from src.db.database import SessionLocal
+    from src.models.order import Order, OrderItem
+    from src.models.product import Product
+    from src.models.user import User
+
+    with SessionLocal() as db:
+        row = db.execute(
+            select(Order.user_id, OrderItem.product_id).join(OrderItem).where(Order.status == "paid").limit(1)
+        ).first()
+    user_id, product_id = row if row else (1, 1)
+
+    def legacy(db) -> None:
+        db.query(User).filter(User.id == user_id, User.is_active.is_(True)).first()
+        (
+            db.query(Order.id)
+            .join(OrderItem, Order.id == OrderItem.order_id)
+            .filter(Order.user_id == user_id, Order.status == "paid", OrderItem.product_id == product_id)
+            .limit(1)
+            .scalar()
+        )
+        db.query(Product).filter(Product.id == product_id).first()
+
+    def prebuilt(db) -> None:
+        db.execute(statements.active_user_by_id, {"user_id": user_id}).scalar_one_or_none()
+        db.execute(statements.paid_order_id_for_product, {"user_id": user_id, "product_id": product_id}).scalar()
+        db.execute(statements.product_by_id, {"product_id": product_id}).scalar_one_or_none()
+
+    def run(label: str, lookups) -> None:
+        for _ in range(200):  # préchauffage : cache de compilation et pool de connexions
+            with SessionLocal() as db:
+                lookups(db)
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(iterations):
+            with SessionLocal() as db:
+                lookups(db)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        _report(label, cpu, iterations, f"CPU ({wall / iterations * 1e6:.1f} µs/req mur)")
+
+    print(f"statements — utilisateur + droit de téléchargement + produit, {iterations} requêtes")
+    run("db.query(...) (avant)", legacy)
+    run("select() préconstruits", prebuilt)
+
+
+def bench_search(titles: int = 10_000, queries: int = 2000) -> None:
+    """Index trigrammes des titres : construction, mémoire et latence des suggestions (fautes et préfixes)."""
+    import random
+    import tracemalloc
+
+    from src.services.search import TitleIndex
+
+    rng = random.Random(42)
+    # Vocabulaire réaliste : quelques mots fréquents et une longue traîne de mots rares (loi de Zipf)
+    common = (
+        "guide pratique méthode réussir votre premier les des pour et de la le en avec sans tout "
+        "alternance carrière cuisine python finances anglais histoire secrets voyage santé"
+    ).split()
+    syllables = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo ga ge gi la le li lo lu ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so su ta te ti to tu va ve vi vo".split()
+    rare = list(dict.fromkeys("".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(8000)))
+    vocabulary = common + rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    corpus = [
+        " ".join(rng.choices(vocabulary, weights=weights, k=rng.randint(3, 8))).capitalize() for _ in range(titles)
+    ]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = TitleIndex((title, i) for i, title in enumerate(corpus))
+    build = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def typo(word: str) -> str:
+        if len(word) < 4:
+            return word
+        i = rng.randrange(1, len(word) - 2)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+    samples = []
+    for _ in range(queries):
+        words = rng.choice(corpus).split()[:2]
+        kind = rng.random()
+        if kind < 0.4:
+            samples.append(words[0][: rng.randint(2, 6)])  # saisie en cours
+        elif kind < 0.8:
+            samples.append(" ".join(typo(w) for w in words))  # faute de frappe
+        else:
+            samples.append(" ".join(words))
+    latencies = []
+    for q in samples:
+        start = time.perf_counter()
+        index.search(q, limit=8)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(f"search — {titles} titres, {queries} requêtes (préfixes, fautes, mots entiers)")
+    print(f"  construction {build * 1e3:8.1f} ms   mémoire {memory / 1024 / 1024:6.2f} Mo ({memory / titles * 10_000 / 1024 / 1024:.2f} Mo / 10k titres)")
+    print(
+        f"  requête      {statistics.mean(latencies) * 1e6:8.1f} µs moy   "
+        f"{latencies[len(latencies) // 2] * 1e6:8.1f} µs p50   {latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} µs p99"
+    )
+
+
+def bench_serialization(products: int = 1000, iterations: int = 300) -> None:
+    """Encodage JSON d'un catalogue : chemins FastAPI (revalidation) vs TypeAdapter sans revalidation."""
+    import tracemalloc
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.utils import create_model_field
+
+    _load_app()
+    from src.routes.products import ProductResponse, _product_list
+
+    catalog = [ProductResponse(**p) for p in _catalog_payload(products)]
+    field = create_model_field("Response", List[ProductResponse], mode="serialization")
+
+    def stdlib() -> bytes:
+        return json.dumps(jsonable_encoder(catalog), ensure_ascii=False).encode()
+
+    def response_model() -> bytes:
+        # Ce que fait fastapi.routing.serialize_response pour une route avec response_model
+        value, _ = field.validate(catalog, {}, loc=("response",))
+        return field.serialize_json(value)
+
+    paths = {
+        "jsonable_encoder + json (sans response_model)": stdlib,
+        "response_model : revalidation + dump_json": response_model,
+        "TypeAdapter.dump_json, sans revalidation": lambda: _product_list.dump_json(catalog),
+    }
+    try:
+        import orjson
+
+        paths["orjson (model_dump puis dumps)"] = lambda: orjson.dumps([p.model_dump() for p in catalog])
+    except ImportError:
+        pass
+
+    print(f"serialization — catalogue de {products} produits ({len(_product_list.dump_json(catalog))} octets JSON)")
+    for label, encode in paths.items():
+        encode()
+        tracemalloc.start()
+        encode()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        cpu = time.process_time()
+        for _ in range(iterations):
+            encode()
+        _report(label, time.process_time() - cpu, iterations, f"CPU, pic d'allocations {peak / 1024:.0f} Ko")
+
+
+SCENARIOS = {
+    "middleware": bench_middleware,
+    "auth_flood": bench_auth_flood,
+    "bulkheads": bench_bulkheads,
+    "statements": bench_statements,
+    "search": bench_search,
+    "serialization": bench_serialization,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            print(f"Scénario inconnu : {name} (disponibles : {', '.join(SCENARIOS)})")
+            sys.exit(1)
+        SCENARIOS[name]()
+
+
+if __name__ == "__main__":
+    main()
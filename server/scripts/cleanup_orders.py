@@ -0,0 +1,29 @@
+"""
+Passe unique de purge des commandes abandonnées ('pending' sans PaymentIntent, plus vieilles que
+ORDER_CLEANUP_TTL_HOURS), par lots de ORDER_CLEANUP_CHUNK_SIZE. Utile en cron si ORDER_CLEANUP_INTERVAL_SECONDS=0.
+À lancer depuis server/ : python scripts/cleanup_orders.py
+"""
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.product import Product  # noqa: F401,E402
+from src.models.user import User  # noqa: F401,E402
+from src.services.order_cleanup import cleaner  # noqa: E402
+
+
+def main():
+    result = cleaner.run_once()
+    print(
+        f"{result['orders_deleted']} commande(s) et {result['items_deleted']} article(s) supprimés "
+        f"en {result['chunks']} lot(s), {result['duration_ms'] / 1000:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
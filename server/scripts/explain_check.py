@@ -0,0 +1,293 @@
+"""
+Vérification des plans d'exécution des requêtes chaudes (PostgreSQL uniquement).
+
+Crée un schéma jetable, y génère un jeu de données volumineux, exécute les vrais chemins de code
+(authentification, droit de téléchargement, catalogue, historique, export, réconciliation, purge,
+statistiques, recommandations…) en capturant leur SQL, puis passe chaque SELECT capturé dans
+EXPLAIN (ANALYZE, BUFFERS). Code de sortie 1 si un plan lit par Seq Scan une table d'au moins
+SEQ_SCAN_MIN_ROWS lignes, ou n'utilise pas un index attendu (EXPECTED_INDEXES).
+À lancer depuis server/ : python scripts/explain_check.py [facteur d'échelle, défaut 1]
+Le schéma est supprimé à la fin (EXPLAIN_CHECK_KEEP=1 pour le conserver).
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+SCHEMA = "explain_check"
+# Toutes les connexions de l'application (moteur, sessions) travaillent dans le schéma jetable
+os.environ["PGOPTIONS"] = f"{os.environ.get('PGOPTIONS', '')} -c search_path={SCHEMA}".strip()
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from sqlalchemy import event, text  # noqa: E402
+
+from src.db import statements  # noqa: E402
+from src.db.database import Base, SessionLocal, engine  # noqa: E402
+from src.models.download import Download  # noqa: F401,E402
+from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.product import Product  # noqa: F401,E402
+from src.models.recommendation import ProductCooccurrence  # noqa: F401,E402
+from src.models.sales import DailyProductSales  # noqa: F401,E402
+from src.models.user import User  # noqa: E402
+from src.routes import analytics, orders, products  # noqa: E402
+from src.services import order_cleanup, payment_reconciliation, recommendations  # noqa: E402
+from src.services.cache import invalidate_local  # noqa: E402
+from src.services.download_events import download_count  # noqa: E402
+
+from seed_products import upsert_product  # noqa: E402
+
+
+# Volumes pour un facteur d'échelle de 1
+SIZES = {
+    "users": 20_000,
+    "products": 2_000,
+    "orders": 200_000,
+    "downloads": 100_000,
+    "days": 365,
+}
+ACTIVE_PRODUCT_RATIO = 0.05  # catalogue majoritairement archivé : l'index partiel doit servir
+NO_SEQ_SCAN: frozenset[str] = frozenset()
+# En dessous, un Seq Scan tient en quelques blocs et reste le bon plan (petits facteurs d'échelle)
+SEQ_SCAN_MIN_ROWS = 1_000
+# Index que le plan d'un chemin doit utiliser : preuve que les index composites servent
+EXPECTED_INDEXES = {
+    "téléchargement : droit d'accès": {"ix_orders_user_status", "ix_order_items_order_product"},
+    "commandes : historique": {"ix_orders_user_status", "ix_order_items_order_product"},
+    "commandes : export du jour": {"ix_orders_created_at"},
+    "tâche : réconciliation Stripe": {"ix_orders_created_at"},
+}
+
+
+def _seed(conn, scale: float) -> dict:
+    n = {name: max(int(size * scale), 10) for name, size in SIZES.items()}
+    n["days"] = SIZES["days"]
+    conn.execute(
+        text(
+            "INSERT INTO users (email, password_hash, role, is_active, created_at, updated_at) "
+            "SELECT 'user' || g || '@example.com', 'x', 'customer', true, now(), now() "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": n["users"]},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO products (title, description, price_cents, file_key, is_active, created_at, updated_at) "
+            "SELECT 'Ebook ' || g, 'Description', 500 + g % 2000, 'ebooks/' || g || '.pdf', "
+            "g % :every = 0, now(), now() FROM generate_series(1, :n) g"
+        ),
+        {"n": n["products"], "every": round(1 / ACTIVE_PRODUCT_RATIO)},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO orders (user_id, status, total_cents, created_at, stripe_payment_intent_id) "
+            "SELECT 1 + g % :users, "
+            "  CASE WHEN g % 10 < 6 THEN 'paid' WHEN g % 10 < 9 THEN 'pending' ELSE 'failed' END, 1000, "
+            "  (now() at time zone 'utc') - (g % (:days * 24 * 60)) * interval '1 minute', "
+            "  CASE WHEN g % 10 <> 7 THEN 'pi_' || g END "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": n["orders"], "users": n["users"], "days": n["days"]},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO order_items (order_id, product_id, price_cents) "
+            "SELECT o.id, 1 + (o.id * k) % :products, 1000 FROM orders o, generate_series(1, 2) k"
+        ),
+        {"products": n["products"]},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO downloads (user_id, product_id, order_id, downloaded_at) "
+            "SELECT 1 + g % :users, 1 + g % :products, NULL, now() - (g % 10000) * interval '1 minute' "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": n["downloads"], "users": n["users"], "products": n["products"]},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO product_cooccurrences (product_id, other_product_id, count) "
+            "SELECT a, 1 + (a + k) % :products, k FROM generate_series(1, :products) a, generate_series(1, 20) k "
+            "ON CONFLICT DO NOTHING"
+        ),
+        {"products": n["products"]},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO daily_product_sales (date, product_id, ordered_units, units, revenue_cents) "
+            "SELECT current_date - d, p, 2, 1, 1000 "
+            "FROM generate_series(0, :days - 1) d, generate_series(1, :products, 10) p"
+        ),
+        {"days": n["days"], "products": n["products"]},
+    )
+    return n
+
+
+def _hot_paths(n: dict):
+    """(nom, fonction(db), tables tolérées en Seq Scan) : les chemins de code dont les SELECT sont vérifiés."""
+    every = round(1 / ACTIVE_PRODUCT_RATIO)
+    user_id, product_id = n["users"] // 2, n["products"] // 2 // every * every  # produit actif, à toute échelle
+    today = date.today()
+    user = User(id=user_id)
+
+    def user_lookup(db):
+        db.execute(statements.active_user_by_id, {"user_id": user_id}).all()
+
+    def entitlement(db):
+        db.execute(statements.paid_order_id_for_product, {"user_id": user_id, "product_id": product_id}).all()
+
+    def download_product(db):
+        db.execute(statements.product_by_id, {"product_id": product_id}).all()
+
+    def download_limit(db):
+        download_count(db, user_id, product_id, since=datetime.utcnow() - timedelta(days=1))
+
+    def catalog(db):
+        invalidate_local("catalog")
+        products._active_products(db)
+
+    def product_page(db):
+        invalidate_local("catalog")
+        products.get_product(product_id, db)
+
+    def top_k(db):
+        invalidate_local("recommendations")
+        recommendations.top_k(db, product_id)
+
+    def title_upsert(db):
+        upsert_product(db, title=f"Ebook {product_id}", description="x", price_cents=990, file_key="ebooks/x.pdf")
+        db.rollback()
+
+    def history(db):
+        orders.list_my_orders(db=db, current_user=user)
+
+    def export(db):
+        next(orders._export_rows(db, datetime.combine(today, datetime.min.time()), datetime.utcnow()), None)
+
+    def sales(db):
+        analytics.sales_report(today - timedelta(days=6), today, db, None)
+
+    def reconciliation(db):
+        payment_reconciliation._stuck_orders(datetime.utcnow())
+
+    def cleanup(db):
+        order_cleanup._delete_chunk(datetime.utcnow() - timedelta(days=300), 0, 100)
+
+    return [
+        ("auth : utilisateur actif", user_lookup, NO_SEQ_SCAN),
+        ("téléchargement : droit d'accès", entitlement, NO_SEQ_SCAN),
+        ("téléchargement : produit", download_product, NO_SEQ_SCAN),
+        ("téléchargement : compteur anti-abus", download_limit, NO_SEQ_SCAN),
+        ("catalogue : produits actifs", catalog, NO_SEQ_SCAN),
+        ("catalogue : fiche produit", product_page, NO_SEQ_SCAN),
+        ("catalogue : recommandations", top_k, NO_SEQ_SCAN),
+        ("seed : produit par titre", title_upsert, NO_SEQ_SCAN),
+        ("commandes : historique", history, NO_SEQ_SCAN),
+        # Export en masse : un hash join sur order_items/products est légitime dès quelques centaines de commandes
+        ("commandes : export du jour", export, {"order_items", "products"}),
+        ("admin : statistiques 7 jours", sales, NO_SEQ_SCAN),
+        ("tâche : réconciliation Stripe", reconciliation, NO_SEQ_SCAN),
+        ("tâche : purge des abandons", cleanup, NO_SEQ_SCAN),
+    ]
+
+
+def _seq_scans(plan: dict, tables: set[str]) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in tables:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child, tables))
+    return found
+
+
+def _indexes(plan: dict) -> list[str]:
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(_indexes(child))
+    return names
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("explain_check nécessite PostgreSQL (DATABASE_URL)")
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.commit()
+    try:
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            n = _seed(conn, scale)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"Jeu de données : {n} ({time.perf_counter() - started:.1f} s)")
+
+        captured: list[tuple[str, object]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and not executemany:
+                captured.append((statement, parameters))
+
+        with engine.connect() as conn:
+            rows = dict(
+                conn.execute(
+                    text("SELECT relname, reltuples FROM pg_class WHERE relnamespace = CAST(:schema AS regnamespace)"),
+                    {"schema": SCHEMA},
+                ).all()
+            )
+        tables = {table for table in Base.metadata.tables if rows.get(table, 0) >= SEQ_SCAN_MIN_ROWS}
+        failures = 0
+        for name, path, allowed in _hot_paths(n):
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                with SessionLocal() as db:
+                    path(db)
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+            for statement, parameters in captured:
+                raw = engine.raw_connection()
+                try:
+                    with raw.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                        result = cursor.fetchone()[0]
+                    raw.rollback()  # EXPLAIN ANALYZE exécute la requête : rien ne doit rester
+                finally:
+                    raw.close()
+                root = (result if isinstance(result, list) else json.loads(result))[0]
+                plan = root["Plan"]
+                scans = _seq_scans(plan, tables - set(allowed))
+                missing = EXPECTED_INDEXES.get(name, set()) - set(_indexes(plan))
+                buffers = plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)
+                if scans:
+                    status = "SEQ SCAN " + ", ".join(sorted(set(scans)))
+                elif missing:
+                    status = "SANS " + ", ".join(sorted(missing))
+                else:
+                    status = "ok"
+                print(
+                    f"  [{status:>8}] {name:<36} {root['Execution Time']:8.2f} ms  {buffers:6d} blocs  "
+                    f"{', '.join(dict.fromkeys(_indexes(plan))) or plan['Node Type']}"
+                )
+                if scans or missing:
+                    failures += 1
+                    print("    " + " ".join(statement.split()))
+        if failures:
+            raise SystemExit(f"{failures} requête(s) en Seq Scan sur une table volumineuse ou sans l'index attendu")
+        print("Aucune régression de plan.")
+    finally:
+        if os.getenv("EXPLAIN_CHECK_KEEP") != "1":
+            with engine.connect() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 """
-Extrait les 3 premières pages de chaque PDF dans media/ebooks/
-et les enregistre dans media/samples/<nom>-extrait.pdf.
+Extrait les 3 premières pages de chaque PDF ebooks/<nom>.pdf du stockage (media/ ou bucket S3)
+et les enregistre sous samples/<nom>-extrait.pdf.
 Si un ebook n'existe pas encore, crée un PDF placeholder (3 pages) pour que le lien fonctionne.
 À lancer depuis server/ : python scripts/extract_samples.py
 """
+import io
 import os
 import sys
 
@@ -12,8 +13,8 @@ SERVER_DIR = os.path.dirname(CURRENT_DIR)
 if SERVER_DIR not in sys.path:
     sys.path.insert(0, SERVER_DIR)
 
-EBOOKS_DIR = os.path.join(SERVER_DIR, "media", "ebooks")
-SAMPLES_DIR = os.path.join(SERVER_DIR, "media", "samples")
+from src.services.storage import StorageError, storage  # noqa: E402
+
 MAX_PAGES = 3
 
 # Fichiers attendus (alignés avec seed_products.py) pour générer les extraits ou placeholders
@@ -31,45 +32,50 @@ def main():
         print("Installez pypdf : pip install pypdf")
         sys.exit(1)
 
-    os.makedirs(SAMPLES_DIR, exist_ok=True)
-    os.makedirs(EBOOKS_DIR, exist_ok=True)
-
     count = 0
+    missing = 0
     for name in EXPECTED_EBOOKS:
         base, _ = os.path.splitext(name)
         out_name = f"{base}-extrait.pdf"
-        out_path = os.path.join(SAMPLES_DIR, out_name)
-        src = os.path.join(EBOOKS_DIR, name)
+        out_key = f"samples/{out_name}"
+
+        try:
+            # Bucket S3 : le PDF est lu depuis le cache disque local (téléchargé au plus une fois)
+            src = storage.local_path(f"ebooks/{name}")
+        except StorageError:
+            src = None
 
-        if os.path.isfile(src):
+        buffer = io.BytesIO()
+        if src is not None:
             try:
                 reader = PdfReader(src)
                 writer = PdfWriter()
                 n = min(MAX_PAGES, len(reader.pages))
                 for i in range(n):
                     writer.add_page(reader.pages[i])
-                with open(out_path, "wb") as f:
-                    writer.write(f)
+                writer.write(buffer)
+                storage.write(out_key, buffer.getvalue(), "application/pdf")
                 print(f"  {name} -> {out_name} ({n} page(s))")
                 count += 1
             except Exception as e:
                 print(f"  Erreur {name}: {e}")
         else:
+            missing += 1
             # Placeholder : 3 pages vierges pour que le lien « Voir un extrait » fonctionne
             try:
                 writer = PdfWriter()
                 for _ in range(MAX_PAGES):
                     writer.add_blank_page(width=595, height=842)  # A4
-                with open(out_path, "wb") as f:
-                    writer.write(f)
+                writer.write(buffer)
+                storage.write(out_key, buffer.getvalue(), "application/pdf")
                 print(f"  (placeholder) -> {out_name} (3 pages)")
                 count += 1
             except Exception as e:
                 print(f"  Erreur placeholder {out_name}: {e}")
 
-    print(f"Terminé : {count} extrait(s) dans media/samples/")
-    if not os.listdir(EBOOKS_DIR):
-        print("Astuce : placez les vrais PDF dans media/ebooks/ et relancez pour remplacer les placeholders.")
+    print(f"Terminé : {count} extrait(s) dans samples/")
+    if missing:
+        print("Astuce : placez les vrais PDF sous ebooks/ dans le stockage et relancez pour remplacer les placeholders.")
 
 
 if __name__ == "__main__":
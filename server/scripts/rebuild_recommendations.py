@@ -0,0 +1,51 @@
+"""
+Recalcule entièrement la table product_cooccurrences (« les clients ont aussi acheté »)
+à partir des commandes payées, en parcourant order_items par lots.
+À lancer depuis server/ : python scripts/rebuild_recommendations.py
+En temps normal la table est tenue à jour à chaque paiement ; ce script sert à l'initialiser
+ou à la réparer.
+"""
+import os
+import sys
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from src.db.database import Base, SessionLocal, engine  # noqa: E402
+from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.product import Product  # noqa: F401,E402
+from src.models.user import User  # noqa: F401,E402
+from src.services import recommendations  # noqa: E402
+
+MAX_ATTEMPTS = 5
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            # Instantané cohérent : un paiement concurrent fait échouer la transaction au lieu d'être perdu
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            pairs = recommendations.rebuild_all(db)
+            db.commit()
+            print(f"Reconstruction OK : {pairs} paire(s) en {time.perf_counter() - start:.1f} s")
+            return
+        except DBAPIError as e:
+            db.rollback()
+            print(f"  Tentative {attempt} interrompue par une écriture concurrente : {e.orig}")
+        finally:
+            db.close()
+    print("Échec de la reconstruction après plusieurs tentatives.")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Passe unique de réconciliation des paiements : commandes 'pending' dont le PaymentIntent Stripe
+a réussi ou a été annulé (webhook perdu). Utile en cron si PAYMENT_RECONCILE_INTERVAL_SECONDS=0.
+À lancer depuis server/ : python scripts/reconcile_payments.py
+"""
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.product import Product  # noqa: F401,E402
+from src.models.recommendation import ProductCooccurrence  # noqa: F401,E402
+from src.models.sales import DailyProductSales  # noqa: F401,E402
+from src.models.user import User  # noqa: F401,E402
+import src.services.invalidation  # noqa: F401,E402  (NOTIFY aux workers en cours d'exécution)
+from src.services.payment_reconciliation import reconciler  # noqa: E402
+from src.services.stripe_config import STRIPE_SECRET_KEY  # noqa: E402
+
+
+def main():
+    if not STRIPE_SECRET_KEY:
+        raise SystemExit("STRIPE_SECRET_KEY manquant")
+    result = reconciler.run_once()
+    print(
+        f"{result['checked']} commande(s) en attente vérifiée(s) en {result['stripe_pages']} page(s) Stripe : "
+        f"{result['paid']} payée(s), {result['failed']} échouée(s), {result['skipped']} sautée(s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Vérification du routage des lectures vers les réplicas (round-robin, bascule, retour au primaire).
+
+Nécessite au moins deux instances PostgreSQL joignables en plus du primaire (deux instances locales
+suffisent : seul le routage est vérifié, pas la réplication) :
+    DATABASE_URL=postgresql://...:5432/db \\
+    DATABASE_REPLICA_URLS=postgresql://...:5433/db,postgresql://...:5434/db \\
+    python scripts/replica_failover_check.py [--watch SECONDES]
+Un réplica injoignable (port fermé) est ajouté à la liste pour vérifier la bascule. Avec --watch, les
+lectures continuent et leur répartition est affichée chaque seconde : arrêter puis relancer un des
+réplicas (pg_ctl stop / start) pendant ce temps montre la bascule sur une vraie panne.
+Code de sortie 1 si une vérification échoue.
+"""
+import os
+import sys
+import time
+from collections import Counter
+
+DEAD_REPLICA_URL = "postgresql://postgres@127.0.0.1:1/unreachable"
+
+_replicas = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+if len(_replicas) < 2:
+    raise SystemExit("replica_failover_check nécessite au moins deux URLs dans DATABASE_REPLICA_URLS")
+os.environ["DATABASE_REPLICA_URLS"] = ",".join([*_replicas, DEAD_REPLICA_URL])
+os.environ.setdefault("REPLICA_RETRY_SECONDS", "2")
+os.environ.setdefault("REPLICA_MAX_LAG_SECONDS", "1")
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from sqlalchemy import text  # noqa: E402
+
+from src.db.database import engine, get_read_db, replica_engines, replica_router  # noqa: E402
+from src.services.invalidation import _invalidate  # noqa: E402
+
+
+def _name(bind) -> str:
+    if bind is engine:
+        return "primaire"
+    return f"réplica {replica_engines.index(bind) + 1} ({bind.url.host}:{bind.url.port})"
+
+
+def _read() -> str:
+    """Une lecture par la dépendance des routes ; renvoie le moteur qui l'a servie."""
+    dependency = get_read_db()
+    db = next(dependency)
+    try:
+        db.execute(text("SELECT 1")).scalar_one()
+        return _name(db.get_bind())
+    finally:
+        dependency.close()
+
+
+def _checked_out() -> int:
+    return sum(bind.pool.checkedout() for bind in (engine, *replica_engines))
+
+
+def main():
+    failures = []
+
+    def check(label: str, ok: bool, detail: str = "") -> None:
+        print(f"  [{'ok' if ok else 'ÉCHEC':>5}] {label}{' — ' + detail if detail else ''}")
+        if not ok:
+            failures.append(label)
+
+    print(f"Primaire {engine.url.render_as_string(hide_password=True)}, {len(replica_engines)} réplicas")
+
+    dependency = get_read_db()
+    next(dependency)
+    check("session ouverte sans requête : aucune connexion prise", _checked_out() == 0)
+    dependency.close()
+
+    reads = Counter(_read() for _ in range(len(_replicas) * 4))
+    dead = _name(replica_engines[-1])
+    check(
+        "round-robin entre réplicas sains",
+        set(reads) == {_name(e) for e in replica_engines[:-1]} and len(set(reads.values())) == 1,
+        dict(reads).__repr__(),
+    )
+    check("réplica injoignable écarté", not replica_router.status()[-1]["healthy"] and dead not in reads)
+
+    time.sleep(replica_router.retry_seconds + 0.1)
+    reads = Counter(_read() for _ in range(len(replica_engines)))
+    check("réplica retenté après REPLICA_RETRY_SECONDS, puis de nouveau écarté", dead not in reads
+          and not replica_router.status()[-1]["healthy"], dict(reads).__repr__())
+
+    _invalidate("catalog", None)
+    first = _read()
+    check("invalidation de cache : lectures sur le primaire", first == "primaire", first)
+    time.sleep(replica_router.max_lag_seconds + 0.1)
+    after = _read()
+    check("après REPLICA_MAX_LAG_SECONDS : retour aux réplicas", after != "primaire", after)
+
+    for replica in replica_engines:
+        replica_router.mark_down(replica)
+    fallback = _read()
+    check("tous les réplicas en panne : repli sur le primaire", fallback == "primaire", fallback)
+    for replica in replica_engines[:-1]:
+        replica_router.mark_up(replica)
+
+    watch = float(sys.argv[sys.argv.index("--watch") + 1]) if "--watch" in sys.argv else 0
+    deadline = time.monotonic() + watch
+    while time.monotonic() < deadline:
+        second_end = time.monotonic() + 1
+        reads, errors = Counter(), 0
+        while time.monotonic() < second_end:
+            try:
+                reads[_read()] += 1
+            except Exception:
+                errors += 1
+        print(f"  {dict(reads)} erreurs={errors}")
+
+    if failures:
+        raise SystemExit(f"{len(failures)} vérification(s) en échec")
+    print("Routage des lectures conforme.")
+
+
+if __name__ == "__main__":
+    main()
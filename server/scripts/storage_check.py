@@ -0,0 +1,136 @@
+"""
+Vérification du backend de stockage S3 (écriture, cache disque partagé, URL présignées).
+
+Sans STORAGE_BUCKET_URL, un serveur S3 local est lancé avec moto (pip install "moto[server]") ;
+sinon le bucket indiqué est utilisé (MinIO, R2…), sous un préfixe jetable supprimé à la fin :
+    STORAGE_BUCKET_URL=http://localhost:9000/ebooks STORAGE_ACCESS_KEY=... STORAGE_SECRET_KEY=... \\
+    python scripts/storage_check.py
+Deux caches sur le même répertoire temporaire jouent le rôle de deux workers.
+Code de sortie 1 si une vérification échoue.
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(CURRENT_DIR)
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from src.services.storage import (  # noqa: E402
+    STORAGE_ACCESS_KEY,
+    STORAGE_BUCKET_URL,
+    STORAGE_REGION,
+    STORAGE_SECRET_KEY,
+    DiskLRUCache,
+    S3Storage,
+    StorageError,
+)
+
+FILE_BYTES = 64 * 1024
+
+
+def _moto_bucket():
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    bucket_url = f"http://{host}:{port}/storage-check"
+    return server, bucket_url
+
+
+def main():
+    server = None
+    bucket_url, region = STORAGE_BUCKET_URL, STORAGE_REGION
+    access_key, secret_key = STORAGE_ACCESS_KEY, STORAGE_SECRET_KEY
+    if not bucket_url:
+        server, bucket_url = _moto_bucket()
+        access_key, secret_key, region = "check", "check", "us-east-1"
+    cache_dir = tempfile.mkdtemp(prefix="storage-check-")
+    prefix = f"storage-check/{uuid.uuid4().hex[:8]}"
+    failures = []
+
+    def check(label: str, ok: bool, detail: str = "") -> None:
+        print(f"  [{'ok' if ok else 'ÉCHEC':>5}] {label}{' — ' + detail if detail else ''}")
+        if not ok:
+            failures.append(label)
+
+    # Deux "workers" : même répertoire de cache, place pour deux fichiers et demi au total
+    max_bytes = FILE_BYTES * 5 // 2
+    workers = [
+        S3Storage(bucket_url, access_key, secret_key, region, DiskLRUCache(cache_dir, max_bytes)) for _ in range(2)
+    ]
+    first = workers[0]
+    if server is not None:
+        first.client.create_bucket(Bucket=first.bucket)
+    downloads = []
+    lock = threading.Lock()
+    for worker in workers:
+        download_file = worker.client.download_file
+
+        def counted(bucket, key, dest, _download=download_file):
+            with lock:
+                downloads.append(key)
+            _download(bucket, key, dest)
+
+        worker.client.download_file = counted
+
+    keys = [f"{prefix}/ebook-{i}.pdf" for i in range(4)]
+    try:
+        print(f"Bucket {bucket_url}{' (moto)' if server else ''}, cache {cache_dir}")
+        for i, key in enumerate(keys):
+            first.write(key, bytes([i]) * FILE_BYTES, "application/pdf")
+        check("écriture puis exists()", all(first.exists(key) for key in keys))
+        check("clé absente : exists() faux", not first.exists(f"{prefix}/absent.pdf"))
+        try:
+            first.local_path(f"{prefix}/absent.pdf")
+            check("clé absente : StorageError", False)
+        except StorageError:
+            check("clé absente : StorageError", True)
+
+        downloads.clear()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: first.local_path(keys[0]), range(8)))
+        check("8 lectures simultanées : un seul téléchargement", len(downloads) == 1, f"{len(downloads)}")
+        with open(paths[0], "rb") as f:
+            check("contenu du fichier en cache", f.read() == bytes([0]) * FILE_BYTES)
+
+        downloads.clear()
+        workers[1].local_path(keys[0])
+        check("autre worker : lecture servie par le cache partagé", not downloads, f"{len(downloads)}")
+
+        for i, key in enumerate(keys):
+            workers[i % 2].local_path(key)
+        usage = workers[1].cache.size
+        check("occupation du répertoire bornée malgré deux workers", usage <= max_bytes, f"{usage} / {max_bytes} octets")
+        cached = sorted(os.listdir(cache_dir))
+        check("éviction des moins récemment lus", cached == sorted(k.replace("/", "__") for k in keys[-2:]), ", ".join(cached))
+
+        first.write(keys[-1], b"v2", "application/pdf")
+        with open(workers[0].local_path(keys[-1]), "rb") as f:
+            check("réécriture : le cache ne sert plus l'ancienne version", f.read() == b"v2")
+
+        with urllib.request.urlopen(first.download_url(keys[1], expires_in=60)) as response:
+            check("URL présignée téléchargeable", response.read() == bytes([1]) * FILE_BYTES)
+    finally:
+        for key in keys:
+            first.client.delete_object(Bucket=first.bucket, Key=key)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if server is not None:
+            server.stop()
+
+    if failures:
+        raise SystemExit(f"{len(failures)} vérification(s) en échec")
+    print("Stockage S3 conforme.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,13 @@ if CURRENT_DIR not in sys.path:
 
 from src.db.database import Base, SessionLocal, engine  # noqa: E402
 from src.models.product import Product  # noqa: E402
+from src.models.download import Download  # noqa: F401,E402
 from src.models.order import Order, OrderItem  # noqa: F401,E402
+from src.models.recommendation import ProductCooccurrence  # noqa: F401,E402
+from src.models.sales import DailyProductSales  # noqa: F401,E402
 from src.models.user import User  # noqa: F401,E402
+import src.services.invalidation  # noqa: F401,E402  (NOTIFY aux workers en cours d'exécution)
+from src.services.storage import storage  # noqa: E402
 
 
 def upsert_product(
@@ -74,8 +79,8 @@ def main():
             ),
             price_cents=1490,
             file_key="ebooks/decrochez-votre-alternance.pdf",
-            cover_image_url="/static/covers/decrochez-votre-alternance.png",
-            sample_pdf_url="/static/samples/decrochez-votre-alternance-extrait.pdf",
+            cover_image_url=storage.public_url("covers/decrochez-votre-alternance.png"),
+            sample_pdf_url=storage.public_url("samples/decrochez-votre-alternance-extrait.pdf"),
         )
 
         p2, created2 = upsert_product(
@@ -95,8 +100,8 @@ def main():
             ),
             price_cents=990,
             file_key="ebooks/chroniques-une-voix-qui-sest-revelee.pdf",
-            cover_image_url="/static/covers/chroniques-une-voix-qui-sest-revelee.png",
-            sample_pdf_url="/static/samples/chroniques-une-voix-qui-sest-revelee-extrait.pdf",
+            cover_image_url=storage.public_url("covers/chroniques-une-voix-qui-sest-revelee.png"),
+            sample_pdf_url=storage.public_url("samples/chroniques-une-voix-qui-sest-revelee-extrait.pdf"),
         )
 
         p3, created3 = upsert_product(
@@ -117,8 +122,8 @@ def main():
             ),
             price_cents=1290,
             file_key="ebooks/ebook-le-secret-dune-belle-diction.pdf",
-            cover_image_url="/static/covers/le-secret-dune-belle-diction.png",
-            sample_pdf_url="/static/samples/ebook-le-secret-dune-belle-diction-extrait.pdf",
+            cover_image_url=storage.public_url("covers/le-secret-dune-belle-diction.png"),
+            sample_pdf_url=storage.public_url("samples/ebook-le-secret-dune-belle-diction-extrait.pdf"),
         )
 
         db.commit()
@@ -0,0 +1,92 @@
+"""Construction des index des modèles sur une base existante, sans bloquer les écritures.
+
+`create_all` ne crée les index qu'avec leur table : ceux ajoutés depuis aux modèles sont construits ici
+avec CREATE INDEX CONCURRENTLY (hors transaction, connexion AUTOCOMMIT), qui laisse passer les écritures
+(commandes, paiements) pendant la construction. Lancé une fois par démarrage, en tâche de fond, par
+run.py / start.sh — jamais à l'import de chaque worker — ou à la main : python -m src.db.indexes
+Un verrou consultatif empêche deux instances de construire en même temps ; un index laissé INVALID par
+une construction interrompue est supprimé puis reconstruit. Les index retirés des modèles (OBSOLETE_INDEXES)
+sont supprimés avec DROP INDEX CONCURRENTLY, une fois ceux qui les remplacent construits.
+"""
+import sys
+import time
+import zlib
+
+from sqlalchemy import inspect, text
+
+from src.db.database import Base, engine
+from src.models import download, order, product, recommendation, sales, user  # noqa: F401  (tables de Base)
+
+
+_LOCK_KEY = zlib.crc32(b"create-indexes")
+# Couverts par la première colonne d'un composite, ou jamais retenus par le planificateur (scripts/explain_check.py)
+OBSOLETE_INDEXES = (
+    "ix_orders_user_id",
+    "ix_order_items_order_id",
+    "ix_orders_user_created_at",
+    "ix_orders_status_created_at",
+)
+
+
+def _invalid_indexes(conn) -> set[str]:
+    return set(
+        conn.execute(
+            text("SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid")
+        ).scalars()
+    )
+
+
+def create_indexes() -> list[str] | None:
+    """Construit les index manquants des tables existantes ; renvoie leurs noms (None si une autre instance s'en charge)."""
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+        return []
+    built = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY}).scalar():
+            return None
+        try:
+            invalid = _invalid_indexes(conn)
+            inspector = inspect(conn)
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue  # créée plus tard par create_all, avec ses index
+                existing = {index["name"] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name in invalid:
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    elif index.name in existing:
+                        continue
+                    # Option posée le temps de la construction : create_all l'exécute dans une transaction
+                    options = index.dialect_options["postgresql"]
+                    options["concurrently"] = True
+                    try:
+                        index.create(bind=conn)
+                    finally:
+                        options["concurrently"] = False
+                    built.append(index.name)
+            for name in OBSOLETE_INDEXES:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+    return built
+
+
+def main():
+    started = time.monotonic()
+    try:
+        built = create_indexes()
+    except Exception as e:
+        print(f"Warning: migration indexes failed: {e}", file=sys.stderr)
+        raise SystemExit(1)
+    if built is None:
+        print("Index : construction déjà en cours sur une autre instance", file=sys.stderr)
+    elif built:
+        print(f"Index construits en {time.monotonic() - started:.1f} s : {', '.join(built)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Requêtes des chemins chauds (authentification, fiche produit, droit de téléchargement), construites une fois.
+
+Les paramètres sont des `bindparam` : chaque exécution réutilise le même objet, dont la clé de cache est
+calculée sans reconstruire l'arbre de la requête, et retrouve le SQL déjà compilé dans le cache du moteur
+(au lieu de repasser par `db.query(...).filter(...)` à chaque requête HTTP).
+"""
+from sqlalchemy import bindparam, select
+
+from src.models.order import Order, OrderItem
+from src.models.product import Product
+from src.models.user import User
+
+
+active_user_by_id = select(User).where(User.id == bindparam("user_id"), User.is_active.is_(True))
+
+product_by_id = select(Product).where(Product.id == bindparam("product_id"))
+
+active_product_by_id = product_by_id.where(Product.is_active.is_(True))
+
+# Une commande payée de l'utilisateur contenant le produit (droit de téléchargement)
+paid_order_id_for_product = (
+    select(Order.id)
+    .join(OrderItem, Order.id == OrderItem.order_id)
+    .where(
+        Order.user_id == bindparam("user_id"),
+        Order.status == "paid",
+        OrderItem.product_id == bindparam("product_id"),
+    )
+    .limit(1)
+)
@@ -1,16 +1,26 @@
 import os
-
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from sqlalchemy import text
 
 from src.db.database import Base, engine
-from src.routes import auth, products, orders, payments, downloads
+from src.middleware.compression import CompressionMiddleware
+from src.middleware.load_shedding import LoadSheddingMiddleware
+from src.middleware.proxy_headers import ProxyHeadersMiddleware
+from src.routes import analytics, auth, products, orders, payments, downloads
+from src.services.download_events import download_events
+from src.services.invalidation import listener as invalidation_listener
+from src.services.load_shedding import admission
+from src.services.metrics import collect as collect_metrics
+from src.services.order_cleanup import cleaner as order_cleaner
+from src.services.payment_reconciliation import reconciler as payment_reconciler
+from src.services.rate_limit import RATE_LIMIT_BACKEND, RATE_LIMIT_TABLE_DDL
+from src.services.warmup import warmup
 
 
 # Création des tables au démarrage ; en cas d'échec (ex. DB injoignable), on démarre quand même pour que /health réponde
@@ -38,26 +48,69 @@ except Exception as e:
     import sys
     print(f"Warning: migration sample_pdf_url failed: {e}", file=sys.stderr)
 
+# Index ajoutés aux modèles sur des tables existantes : construits une fois par démarrage, sans bloquer
+# les écritures, par src.db.indexes (lancé en tâche de fond par run.py / start.sh), pas par chaque worker
+
+# Table partagée de limitation de débit /auth (backend "postgres" uniquement)
+if RATE_LIMIT_BACKEND == "postgres":
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(RATE_LIMIT_TABLE_DDL))
+            conn.commit()
+    except Exception as e:
+        import sys
+        print(f"Warning: migration rate_limit_buckets failed: {e}", file=sys.stderr)
+
 # CORS : en prod, définir CORS_ORIGINS (ex. "https://monapp.vercel.app")
 _cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:5174")
 CORS_ORIGINS_LIST = [o.strip() for o in _cors_origins.split(",") if o.strip()]
 
+# Compression : les réponses de ces préfixes (catalogue, couvertures) sont compressées une seule fois puis servies depuis le cache
+_compression_cache_prefixes = os.getenv("COMPRESSION_CACHE_PREFIXES", "/products,/static/covers/")
+COMPRESSION_CACHE_PREFIXES = tuple(p.strip() for p in _compression_cache_prefixes.split(",") if p.strip())
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Chaque worker écoute les invalidations de cache émises par les autres (LISTEN/NOTIFY)
+    invalidation_listener.start()
+    # Commandes 'pending' dont le webhook Stripe s'est perdu (un seul worker exécute les passes : verrou consultatif)
+    payment_reconciler.start()
+    # Purge par petits lots des commandes abandonnées sans PaymentIntent
+    order_cleaner.start()
+    download_events.start()
+    # Pool, requêtes chaudes et caches préparés en arrière-plan ; /ready répond 503 d'ici là
+    warmup.start()
+    # Retard de la boucle et attente du pool relevés en continu pour le délestage
+    await admission.start()
+    try:
+        yield
+    finally:
+        await admission.stop()
+        warmup.stop()
+        # Vide la file des téléchargements en base avant de rendre la main
+        download_events.stop()
+        order_cleaner.stop()
+        payment_reconciler.stop()
+        invalidation_listener.stop()
+
+
 app = FastAPI(
     title="Ebook Store API",
     description="API pour l'application de vente d'ebooks / PDF",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
-class ProxyHeadersMiddleware(BaseHTTPMiddleware):
-    """En prod (Railway, etc.), le proxy envoie X-Forwarded-Proto. On force le scheme en https pour que les redirections (ex. /products -> /products/) pointent vers HTTPS."""
-    async def dispatch(self, request: Request, call_next):
-        if request.headers.get("x-forwarded-proto") == "https":
-            request.scope["scheme"] = "https"
-        return await call_next(request)
-
-
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    cache_prefixes=COMPRESSION_CACHE_PREFIXES,
+)
 app.add_middleware(ProxyHeadersMiddleware)
+app.add_middleware(LoadSheddingMiddleware, controller=admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS_LIST,
@@ -76,6 +129,7 @@ app.include_router(products.router)
 app.include_router(orders.router)
 app.include_router(payments.router)
 app.include_router(downloads.router)
+app.include_router(analytics.router)
 
 
 @app.get("/health", tags=["system"])
@@ -83,6 +137,34 @@ def health_check() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/ready", tags=["system"])
+def readiness_check():
+    """Prêt à recevoir du trafic : préparation terminée, base joignable et canal d'invalidation des caches connecté."""
+    checks = {"warmup": "ok", "database": "ok", "cache_invalidation": "ok"}
+    if not warmup.done.is_set():
+        # Une étape requise en échec est retentée ; d'ici là, pas de trafic
+        failed = warmup.failed
+        checks["warmup"] = "failed: " + ", ".join(failed) if failed else "pending"
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        checks["database"] = "unavailable"
+    if invalidation_listener.enabled and not invalidation_listener.connected.is_set():
+        checks["cache_invalidation"] = "disconnected"
+    ready = all(v == "ok" for v in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+    )
+
+
+@app.get("/metrics", tags=["system"])
+async def metrics() -> dict:
+    """Instantané des compteurs internes du worker (cloisons, etc.)."""
+    return collect_metrics()
+
+
 @app.get("/", tags=["system"])
 def root() -> dict:
     return {"message": "Bienvenue sur l'API de vente d'ebooks"}
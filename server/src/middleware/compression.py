@@ -0,0 +1,215 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except Exception:  # pragma: no cover
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "image/svg+xml",
+    "text/",
+    "application/javascript",
+)
+
+
+def _negotiate(accept_encoding: str) -> str | None:
+    """Choisit br si disponible et accepté, sinon gzip ; None si le client n'accepte rien."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressedVariantCache:
+    """Cache LRU des variantes compressées, borné en nombre d'entrées et en octets.
+
+    Les réponses répétées (catalogue, couvertures SVG) ne sont compressées qu'une fois.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> bytes | None:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = value
+        self.size += len(value)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class CompressionMiddleware:
+    """Compression gzip/brotli en ASGI pur.
+
+    - Réponses en un seul morceau (JSONResponse, petits fichiers statiques) : compression en bloc,
+      avec cache des variantes pour les chemins listés dans `cache_prefixes`.
+    - Réponses en flux : compression incrémentale, sans mise en mémoire tampon du corps complet.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache_prefixes: tuple[str, ...] = (),
+        cache: CompressedVariantCache | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_prefixes = tuple(cache_prefixes)
+        self.cache = cache if cache is not None else CompressedVariantCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = _negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, scope["path"], send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+
+    def stream_compressor(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress, compressor.flush
+
+    def is_cacheable(self, path: str) -> bool:
+        return bool(self.cache_prefixes) and path.startswith(self.cache_prefixes)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, path: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.path = path
+        self.downstream = send
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.streaming = False
+        self.process = None
+        self.finish = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                message["status"] != 200
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                self.passthrough = True
+                await self.downstream(message)
+                return
+            # On attend le premier morceau du corps pour savoir s'il s'agit d'un flux
+            self.start_message = message
+            return
+
+        if self.passthrough or message_type != "http.response.body":
+            if self.start_message is not None:
+                # ex. http.response.pathsend : le fichier est envoyé tel quel
+                await self.downstream(self.start_message)
+                self.start_message = None
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.streaming:
+            chunk = self.process(body)
+            if not more_body:
+                chunk += self.finish()
+            await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        start = self.start_message
+        self.start_message = None
+        headers = MutableHeaders(raw=start["headers"])
+
+        if not more_body:
+            if len(body) < self.middleware.minimum_size:
+                await self.downstream(start)
+                await self.downstream(message)
+                return
+            compressed = self._compress_whole(body, headers)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await self.downstream(start)
+            await self.downstream({"type": "http.response.body", "body": compressed})
+            return
+
+        self.streaming = True
+        self.process, self.finish = self.middleware.stream_compressor(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        del headers["Content-Length"]
+        await self.downstream(start)
+        await self.downstream({"type": "http.response.body", "body": self.process(body), "more_body": True})
+
+    def _compress_whole(self, body: bytes, headers: MutableHeaders) -> bytes:
+        middleware = self.middleware
+        if not middleware.is_cacheable(self.path):
+            return middleware.compress(self.encoding, body)
+        # Fichiers statiques : l'ETag identifie le contenu ; sinon empreinte du corps
+        etag = headers.get("etag")
+        if etag:
+            key = (self.encoding, self.path, etag)
+        else:
+            key = (self.encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = middleware.cache.get(key)
+        if compressed is None:
+            compressed = middleware.compress(self.encoding, body)
+            middleware.cache.put(key, compressed)
+        return compressed
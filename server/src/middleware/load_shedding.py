@@ -0,0 +1,40 @@
+import json
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.services.load_shedding import AdmissionController
+
+
+_BODY = json.dumps({"detail": "Service momentanément surchargé, réessayez dans un instant"}).encode()
+
+
+class LoadSheddingMiddleware:
+    """Refuse en 503 immédiat les requêtes dont la priorité est délestée (voir `src.services.load_shedding`).
+
+    Placé sous CORS : le navigateur peut lire la réponse de refus et son Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        if controller.admit(controller.priority(scope["method"], scope["path"])):
+            await self.app(scope, receive, send)
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_BODY)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": _BODY})
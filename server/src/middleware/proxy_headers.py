@@ -0,0 +1,20 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ProxyHeadersMiddleware:
+    """En prod (Railway, etc.), le proxy envoie X-Forwarded-Proto. On force le scheme en https pour que les redirections (ex. /products -> /products/) pointent vers HTTPS.
+
+    Middleware ASGI pur : pas de tâche ni d'enveloppe de flux par requête comme avec BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-proto":
+                    if value == b"https":
+                        scope["scheme"] = "https"
+                    break
+        await self.app(scope, receive, send)
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from src.db.database import Base
+
+
+class Download(Base):
+    """Trace d'un lien de téléchargement délivré (écrite en différé, par lots)."""
+
+    __tablename__ = "downloads"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="SET NULL"), nullable=True)
+    downloaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Comptage des téléchargements d'un utilisateur pour un produit sur une période (limites d'abus)
+        Index("ix_downloads_user_product_time", "user_id", "product_id", "downloaded_at"),
+    )
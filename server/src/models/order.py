@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from src.db.database import Base
@@ -8,9 +8,15 @@ from src.db.database import Base
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Droit de téléchargement (commandes payées d'un utilisateur) et historique : sert aussi pour user_id seul
+        Index("ix_orders_user_status", "user_id", "status"),
+        # Export comptable, recalcul des agrégats, réconciliation et purge : fenêtres sur created_at
+        Index("ix_orders_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(String, nullable=False, default="pending")  # pending | paid | failed | refunded
     stripe_payment_intent_id = Column(String, unique=True, index=True, nullable=True)
     total_cents = Column(Integer, nullable=False, default=0)
@@ -22,9 +28,13 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Droit de téléchargement : la commande contient-elle ce produit (sans lire la table) ; sert aussi pour order_id seul
+        Index("ix_order_items_order_product", "order_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     price_cents = Column(Integer, nullable=False)
 
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, Numeric, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, Numeric, String, Text
 
 from src.db.database import Base
 
@@ -25,3 +25,14 @@ class Product(Base):
         nullable=False,
     )
 
+    __table_args__ = (
+        # Catalogue : seuls les produits actifs sont lus (index partiel, ignore les produits archivés)
+        Index(
+            "ix_products_active",
+            "id",
+            postgresql_where=is_active.is_(True),
+            sqlite_where=is_active.is_(True),
+        ),
+        # seed_products.upsert_product recherche par titre
+        Index("ix_products_title", "title"),
+    )
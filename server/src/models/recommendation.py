@@ -0,0 +1,18 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer
+
+from src.db.database import Base
+
+
+class ProductCooccurrence(Base):
+    """Nombre de commandes payées contenant à la fois `product_id` et `other_product_id` (table creuse, symétrique)."""
+
+    __tablename__ = "product_cooccurrences"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    other_product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Lecture du top-K d'un produit sans tri
+        Index("ix_product_cooccurrences_top", "product_id", count.desc()),
+    )
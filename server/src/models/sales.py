@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer
+
+from src.db.database import Base
+
+
+class DailyProductSales(Base):
+    """Agrégat journalier par produit, daté du jour de création de la commande.
+
+    `ordered_units` : unités commandées (toutes commandes) ; `units` / `revenue_cents` : commandes payées.
+    """
+
+    __tablename__ = "daily_product_sales"
+
+    date = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    ordered_units = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue_cents = Column(BigInteger, nullable=False, default=0)
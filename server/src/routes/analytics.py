@@ -0,0 +1,91 @@
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.db.database import get_read_db
+from src.models.sales import DailyProductSales
+from src.services.auth import require_admin
+from src.services.bulkheads import bulkhead_route
+
+
+router = APIRouter(prefix="/admin/analytics", tags=["admin"], route_class=bulkhead_route("db"))
+
+
+class SalesFigures(BaseModel):
+    revenue_cents: int
+    units: int
+    ordered_units: int
+    conversion: float  # unités payées / unités commandées
+
+
+class DailySales(SalesFigures):
+    date: date
+
+
+class ProductSales(SalesFigures):
+    product_id: int
+
+
+class SalesReportResponse(BaseModel):
+    date_from: date
+    date_to: date
+    totals: SalesFigures
+    by_day: List[DailySales]
+    by_product: List[ProductSales]
+
+
+def _figures(revenue_cents, units, ordered_units) -> dict:
+    revenue_cents, units, ordered_units = int(revenue_cents or 0), int(units or 0), int(ordered_units or 0)
+    return {
+        "revenue_cents": revenue_cents,
+        "units": units,
+        "ordered_units": ordered_units,
+        "conversion": round(units / ordered_units, 4) if ordered_units else 0.0,
+    }
+
+
+@router.get("/sales", response_model=SalesReportResponse)
+def sales_report(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    db: Session = Depends(get_read_db),
+    _admin=Depends(require_admin),
+) -> SalesReportResponse:
+    """Chiffre d'affaires, unités et conversion sur [from, to], lus uniquement dans les agrégats journaliers."""
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Période invalide")
+
+    sums = (
+        func.sum(DailyProductSales.revenue_cents),
+        func.sum(DailyProductSales.units),
+        func.sum(DailyProductSales.ordered_units),
+    )
+    in_range = (DailyProductSales.date >= date_from, DailyProductSales.date <= date_to)
+
+    by_day = db.execute(
+        select(DailyProductSales.date, *sums).where(*in_range).group_by(DailyProductSales.date).order_by(DailyProductSales.date)
+    ).all()
+    by_product = db.execute(
+        select(DailyProductSales.product_id, *sums)
+        .where(*in_range)
+        .group_by(DailyProductSales.product_id)
+        .order_by(sums[0].desc())
+    ).all()
+
+    return SalesReportResponse(
+        date_from=date_from,
+        date_to=date_to,
+        totals=SalesFigures(
+            **_figures(
+                sum(row[1] or 0 for row in by_day),
+                sum(row[2] or 0 for row in by_day),
+                sum(row[3] or 0 for row in by_day),
+            )
+        ),
+        by_day=[DailySales(date=row[0], **_figures(*row[1:])) for row in by_day],
+        by_product=[ProductSales(product_id=row[0], **_figures(*row[1:])) for row in by_product],
+    )
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 
 from src.db.database import get_db
 from src.models.user import User
-from src.services.auth import create_access_token, hash_password, verify_password, get_current_user
+from src.services.auth import CurrentUser, create_access_token, hash_password, verify_password, get_current_user
+from src.services.bulkheads import bulkhead_route
+from src.services.rate_limit import enforce_auth_rate_limit
 
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=bulkhead_route("auth"))
 
 
 class RegisterRequest(BaseModel):
@@ -39,7 +41,9 @@ class UserResponse(BaseModel):
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> User:
+def register(payload: RegisterRequest, request: Request, db: Session = Depends(get_db)) -> User:
+    # Limitation avant toute requête SQL ou hash bcrypt
+    enforce_auth_rate_limit(request, payload.email)
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email déjà utilisé")
@@ -58,7 +62,8 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> User:
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse:
+def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)) -> TokenResponse:
+    enforce_auth_rate_limit(request, payload.email)
     user = db.query(User).filter(User.email == payload.email).first()
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(
@@ -71,5 +76,5 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse
 
 
 @router.get("/me", response_model=UserResponse)
-def me(current_user: User = Depends(get_current_user)) -> User:
+def me(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     return current_user
\ No newline at end of file
@@ -1,15 +1,22 @@
+import os
+from datetime import datetime, timedelta
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from src.db.database import get_db
-from src.models.order import Order, OrderItem
-from src.models.product import Product
-from src.models.user import User
-from src.services.auth import get_current_user
+from src.db.statements import paid_order_id_for_product, product_by_id
+from src.services.auth import CurrentUser, get_current_user
+from src.services.bulkheads import bulkhead_route
+from src.services.download_events import download_count, download_events
+from src.services.storage import storage
+
 
+# Limite anti-abus : liens délivrés par utilisateur et par produit sur 24 h glissantes (0 = illimité)
+DOWNLOAD_LIMIT_PER_DAY = int(os.getenv("DOWNLOAD_LIMIT_PER_DAY", "0"))
 
-router = APIRouter(prefix="/downloads", tags=["downloads"])
+router = APIRouter(prefix="/downloads", tags=["downloads"], route_class=bulkhead_route("db"))
 
 
 class DownloadLinkResponse(BaseModel):
@@ -21,32 +28,34 @@ class DownloadLinkResponse(BaseModel):
 def get_download_link(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> DownloadLinkResponse:
     # Vérifie que l'utilisateur a au moins une commande payée contenant ce produit
-    has_paid_order = (
-        db.query(Order)
-        .join(OrderItem, Order.id == OrderItem.order_id)
-        .filter(
-            Order.user_id == current_user.id,
-            Order.status == "paid",
-            OrderItem.product_id == product_id,
-        )
-        .first()
-        is not None
-    )
-    if not has_paid_order:
+    paid_order_id = db.execute(
+        paid_order_id_for_product,
+        {"user_id": current_user.id, "product_id": product_id},
+    ).scalar()
+    if paid_order_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Vous n'avez pas acheté ce produit",
         )
 
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = db.execute(product_by_id, {"product_id": product_id}).scalar_one_or_none()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produit introuvable")
 
-    # Ici on renvoie une URL vers le fichier statique servi par FastAPI.
-    # Exemple: /static/ebooks/decrochez-votre-alternance.pdf
-    download_url = f"/static/{product.file_key}"
+    if DOWNLOAD_LIMIT_PER_DAY > 0:
+        recent = download_count(db, current_user.id, product.id, since=datetime.utcnow() - timedelta(days=1))
+        if recent >= DOWNLOAD_LIMIT_PER_DAY:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Nombre maximal de téléchargements atteint pour ce produit, réessayez plus tard",
+            )
+
+    # Stockage local : URL /static servie par FastAPI ; bucket S3 : URL présignée à courte durée de vie
+    download_url = storage.download_url(product.file_key)
+    # Traçabilité sans écriture synchrone : l'événement part en base avec le prochain lot
+    download_events.record(current_user.id, product.id, paid_order_id)
     return DownloadLinkResponse(product_id=product.id, url=download_url)
 
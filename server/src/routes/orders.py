@@ -1,17 +1,43 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 
-from src.db.database import get_db
+from src.db.database import SessionLocal, get_db, get_read_db
 from src.models.order import Order, OrderItem
 from src.models.product import Product
-from src.models.user import User
-from src.services.auth import get_current_user
+from src.services.auth import CurrentUser, get_current_user, require_admin
+from src.services import sales_rollups
+from src.services.pricing import current_prices, price_cart, price_index
+from src.services.serialization import JSONBytesResponse, trusted_json
+from src.services.warmup import warmup
+from src.services.bulkheads import bulkhead_route
+
+
+# Lignes lues par aller-retour du curseur serveur, et encodées avant chaque envoi au client
+ORDERS_EXPORT_CHUNK_ROWS = int(os.getenv("ORDERS_EXPORT_CHUNK_ROWS", "2000"))
 
+EXPORT_COLUMNS = (
+    "order_id",
+    "created_at",
+    "user_id",
+    "status",
+    "stripe_payment_intent_id",
+    "order_total_cents",
+    "product_id",
+    "product_title",
+    "price_cents",
+)
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=bulkhead_route("db"))
 
 
 class OrderItemCreate(BaseModel):
@@ -22,6 +48,11 @@ class OrderCreateRequest(BaseModel):
     items: List[OrderItemCreate]
 
 
+class OrderPlaceRequest(OrderCreateRequest):
+    # Total du devis affiché au client : la commande est refusée (409) s'il diffère du total réel
+    quoted_total_cents: Optional[int] = None
+
+
 class OrderItemResponse(BaseModel):
     product_id: int
     price_cents: int
@@ -46,6 +77,14 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+class OrderQuoteResponse(BaseModel):
+    items: List[OrderItemResponse]
+    total_cents: int
+    invalid_product_ids: List[int]
+    duplicate_product_ids: List[int]
+    valid: bool
+
+
 class OrderDetailResponse(BaseModel):
     id: int
     status: str
@@ -53,39 +92,63 @@ class OrderDetailResponse(BaseModel):
     items: List[OrderItemDetailResponse]
 
 
+_order_detail = TypeAdapter(OrderDetailResponse)
+_order_detail_list = TypeAdapter(List[OrderDetailResponse])
+_order_quote = TypeAdapter(OrderQuoteResponse)
+
+
+@router.post("/quote", response_model=OrderQuoteResponse)
+def quote_order(payload: OrderCreateRequest, db: Session = Depends(get_read_db)) -> JSONBytesResponse:
+    """Valide et chiffre un panier sans le créer : répond depuis l'index des prix en mémoire."""
+    lines, invalid, duplicates = price_cart(price_index(db), (item.product_id for item in payload.items))
+    quote = OrderQuoteResponse(
+        items=[OrderItemResponse(product_id=product_id, price_cents=price_cents) for product_id, price_cents in lines],
+        total_cents=sum(price_cents for _, price_cents in lines),
+        invalid_product_ids=invalid,
+        duplicate_product_ids=duplicates,
+        valid=bool(lines) and not invalid,
+    )
+    return trusted_json(_order_quote, quote)
+
+
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(
-    payload: OrderCreateRequest,
+    payload: OrderPlaceRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Order:
     if not payload.items:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La commande doit contenir au moins un produit")
 
+    # Prix et statut lus sur le primaire, verrouillés jusqu'au commit ; pas de doublons dans une commande
     product_ids = [item.product_id for item in payload.items]
-    products = db.query(Product).filter(Product.id.in_(product_ids), Product.is_active.is_(True)).all()
-    if len(products) != len(product_ids):
+    lines, invalid, duplicates = price_cart(current_prices(db, product_ids), product_ids)
+    if invalid or duplicates:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Un ou plusieurs produits sont invalides ou inactifs")
-
-    # Map id -> product
-    products_map = {p.id: p for p in products}
+    if payload.quoted_total_cents is not None and payload.quoted_total_cents != sum(price for _, price in lines):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Le prix d'un ou plusieurs produits a changé, veuillez vérifier votre panier",
+        )
 
     order = Order(user_id=current_user.id, status="pending", total_cents=0)
     db.add(order)
     db.flush()  # pour avoir order.id
 
     total = 0
-    for item in payload.items:
-        product = products_map[item.product_id]
+    order_items = []
+    for product_id, price_cents in lines:
         order_item = OrderItem(
             order_id=order.id,
-            product_id=product.id,
-            price_cents=product.price_cents,
+            product_id=product_id,
+            price_cents=price_cents,
         )
-        total += product.price_cents
+        total += price_cents
         db.add(order_item)
+        order_items.append(order_item)
 
     order.total_cents = total
+    sales_rollups.record_order_created(db, order.created_at, order_items)
     db.commit()
     db.refresh(order)
     return order
@@ -107,33 +170,125 @@ def _order_to_detail(order: Order) -> OrderDetailResponse:
     )
 
 
-@router.get("/", response_model=List[OrderDetailResponse])
-def list_my_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    orders = (
+def _export_rows(db: Session, start: datetime, end: datetime):
+    """Une ligne par article de commande, lue par curseur serveur (mémoire constante quel que soit le volume)."""
+    stmt = (
+        select(
+            Order.id,
+            Order.created_at,
+            Order.user_id,
+            Order.status,
+            Order.stripe_payment_intent_id,
+            Order.total_cents,
+            OrderItem.product_id,
+            Product.title,
+            OrderItem.price_cents,
+        )
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.created_at >= start, Order.created_at < end)
+        .order_by(Order.id, OrderItem.id)
+        .execution_options(yield_per=ORDERS_EXPORT_CHUNK_ROWS)
+    )
+    # yield_per active stream_results : psycopg 3 lit via un curseur côté serveur, un lot à la fois
+    yield from db.execute(stmt).partitions()
+
+
+def _encode_csv(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in partitions:
+        for row in rows:
+            writer.writerow((*row[:1], row[1].isoformat(), *row[2:]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(partitions):
+    for rows in partitions:
+        chunk = "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, (*row[:1], row[1].isoformat(), *row[2:]))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+        yield chunk.encode("utf-8")
+
+
+@router.get("/export")
+def export_orders(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    format: Literal["csv", "ndjson"] = "csv",
+    db: Session = Depends(get_read_db),
+    _admin=Depends(require_admin),
+) -> StreamingResponse:
+    """Export comptable des commandes créées entre `from` et `to` inclus, avec leurs articles, envoyé par morceaux."""
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Période invalide")
+
+    start = datetime.combine(date_from, time.min)
+    end = datetime.combine(date_to + timedelta(days=1), time.min)
+    # La session reste ouverte jusqu'à la fin de l'envoi : FastAPI ne ferme les dépendances `yield` qu'après la réponse
+    partitions = _export_rows(db, start, end)
+    if format == "csv":
+        body, media_type = _encode_csv(partitions), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _encode_ndjson(partitions), "application/x-ndjson"
+    filename = f"commandes_{date_from.isoformat()}_{date_to.isoformat()}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _user_orders(db: Session, user_id: int) -> list[Order]:
+    return (
         db.query(Order)
-        .filter(Order.user_id == current_user.id)
+        .filter(Order.user_id == user_id)
         .options(joinedload(Order.items).joinedload(OrderItem.product))
+        .order_by(Order.created_at.desc())
         .all()
     )
-    return [_order_to_detail(o) for o in orders]
 
 
-@router.get("/{order_id}", response_model=OrderDetailResponse)
-def get_order(
-    order_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    order = (
+def _order_for_user(db: Session, order_id: int, user_id: int) -> Order | None:
+    return (
         db.query(Order)
-        .filter(Order.id == order_id, Order.user_id == current_user.id)
+        .filter(Order.id == order_id, Order.user_id == user_id)
         .options(joinedload(Order.items).joinedload(OrderItem.product))
         .first()
     )
+
+
+def _warm_queries() -> None:
+    # Historique et détail de commande : requêtes compilées (et eager loading configuré) avant la première requête
+    with SessionLocal() as db:
+        _user_orders(db, 0)
+        _order_for_user(db, 0, 0)
+
+
+@router.get("/", response_model=List[OrderDetailResponse])
+def list_my_orders(
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return trusted_json(_order_detail_list, [_order_to_detail(o) for o in _user_orders(db, current_user.id)])
+
+
+@router.get("/{order_id}", response_model=OrderDetailResponse)
+def get_order(
+    order_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    order = _order_for_user(db, order_id, current_user.id)
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Commande introuvable")
-    return _order_to_detail(order)
+    return trusted_json(_order_detail, _order_to_detail(order))
+
 
+warmup.register_step("orders", _warm_queries, replicas=True)
@@ -2,28 +2,22 @@ import os
 import time
 
 import stripe
-from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from src.db.database import get_db
 from src.models.order import Order
-from src.models.user import User
-from src.services.auth import get_current_user
+from src.services.auth import CurrentUser, get_current_user
+from src.services.bulkheads import bulkhead_route
+from src.services.order_events import mark_order_paid
+from src.services.stripe_config import STRIPE_SECRET_KEY, STRIPE_WEBHOOK_SECRET
 
 
-load_dotenv()
-
-STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
-STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 PAYMENTS_MOCK_ENABLED = os.getenv("PAYMENTS_MOCK_ENABLED", "1")
 
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
-
 
-router = APIRouter(prefix="/payments", tags=["payments"])
+router = APIRouter(prefix="/payments", tags=["payments"], route_class=bulkhead_route("stripe"))
 
 
 class CreatePaymentIntentRequest(BaseModel):
@@ -38,12 +32,19 @@ class CreatePaymentIntentResponse(BaseModel):
 def create_payment_intent(
     payload: CreatePaymentIntentRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> CreatePaymentIntentResponse:
     if not STRIPE_SECRET_KEY:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Stripe n'est pas configuré")
 
-    order = db.query(Order).filter(Order.id == payload.order_id, Order.user_id == current_user.id).first()
+    # Verrou tenu jusqu'au commit du PaymentIntent : la purge des commandes abandonnées ne peut pas
+    # supprimer la commande pendant l'appel Stripe (elle la saute, ou on attend son lot puis 404)
+    order = (
+        db.query(Order)
+        .filter(Order.id == payload.order_id, Order.user_id == current_user.id)
+        .with_for_update()
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Commande introuvable")
     if order.status != "pending":
@@ -72,7 +73,7 @@ class ConfirmPaidRequest(BaseModel):
 def confirm_order_paid_after_payment(
     payload: ConfirmPaidRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> dict:
     """Vérifie auprès de Stripe que le PaymentIntent est réussi et met la commande à jour en 'paid'."""
     if not STRIPE_SECRET_KEY:
@@ -96,7 +97,7 @@ def confirm_order_paid_after_payment(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Paiement non finalisé (statut: {payment_intent.status})",
         )
-    order.status = "paid"
+    mark_order_paid(db, order)
     db.commit()
     return {"status": "ok"}
 
@@ -109,7 +110,7 @@ class MockConfirmRequest(BaseModel):
 def mock_confirm_payment(
     payload: MockConfirmRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> dict:
     if PAYMENTS_MOCK_ENABLED != "1":
         raise HTTPException(
@@ -119,7 +120,7 @@ def mock_confirm_payment(
     order = db.query(Order).filter(Order.id == payload.order_id, Order.user_id == current_user.id).first()
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Commande introuvable")
-    order.status = "paid"
+    mark_order_paid(db, order)
     db.commit()
     return {"status": "ok"}
 
@@ -150,7 +151,7 @@ async def stripe_webhook(
 
         order = db.query(Order).filter(Order.stripe_payment_intent_id == payment_intent_id).first()
         if order:
-            order.status = "paid"
+            mark_order_paid(db, order)
             db.commit()
 
     return {"received": True}
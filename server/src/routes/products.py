@@ -3,16 +3,25 @@ import os
 import re
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from pydantic import BaseModel, TypeAdapter
 from sqlalchemy.orm import Session
 
-from src.db.database import get_db
+from src.db.database import SessionLocal, get_db, get_read_db
+from src.db.statements import active_product_by_id
 from src.models.product import Product
 from src.services.auth import require_admin
+from src.services.bulkheads import bulkhead_route, bulkheads
+from src.services import recommendations
+from src.services.cache import catalog_cache
+from src.services.pricing import price_index
+from src.services.search import TitleIndex
+from src.services.serialization import JSONBytesResponse, trusted_json
+from src.services.storage import storage
+from src.services.warmup import warmup
 
 
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=bulkhead_route("db"))
 
 
 class ProductBase(BaseModel):
@@ -48,18 +57,112 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
-@router.get("/", response_model=List[ProductResponse])
-def list_products(db: Session = Depends(get_db)) -> list[Product]:
+def _active_products(db: Session) -> list[ProductResponse]:
+    # Cache local au worker, invalidé sur tous les workers à chaque écriture de produit
+    cached = catalog_cache.get("list")
+    if cached is not None:
+        return cached
     products = db.query(Product).filter(Product.is_active.is_(True)).all()
-    return products
+    result = [ProductResponse.model_validate(p) for p in products]
+    catalog_cache.set("list", result)
+    return result
+
+
+_product_list = TypeAdapter(List[ProductResponse])
+
+
+def _active_products_json(db: Session) -> bytes:
+    # Le catalogue complet, encodé une fois par invalidation
+    cached = catalog_cache.get("list_json")
+    if cached is not None:
+        return cached
+    result = _product_list.dump_json(_active_products(db))
+    catalog_cache.set("list_json", result)
+    return result
+
+
+def _active_products_by_id(db: Session) -> dict[int, ProductResponse]:
+    cached = catalog_cache.get("by_id")
+    if cached is not None:
+        return cached
+    result = {p.id: p for p in _active_products(db)}
+    catalog_cache.set("by_id", result)
+    return result
+
+
+class ProductSuggestion(BaseModel):
+    id: int
+    title: str
+    price_cents: int
+    cover_image_url: str | None = None
+
+
+_suggestion_list = TypeAdapter(List[ProductSuggestion])
+
+
+def _search_index(db: Session) -> TitleIndex[ProductSuggestion]:
+    # Reconstruit avec le catalogue : toute écriture de produit invalide "catalog" sur tous les workers
+    cached = catalog_cache.get("search")
+    if cached is not None:
+        return cached
+    index = TitleIndex(
+        (
+            p.title,
+            ProductSuggestion(id=p.id, title=p.title, price_cents=p.price_cents, cover_image_url=p.cover_image_url),
+        )
+        for p in _active_products(db)
+    )
+    catalog_cache.set("search", index)
+    return index
+
+
+def warm_catalog() -> int:
+    """Charge le catalogue (encodé), l'index de suggestions et l'index des prix ; renvoie le nombre de produits."""
+    with SessionLocal() as db:
+        _active_products_json(db)
+        _active_products_by_id(db)
+        _search_index(db)
+        price_index(db)
+        return len(_active_products(db))
+
+
+@router.get("/", response_model=List[ProductResponse])
+def list_products(db: Session = Depends(get_read_db)) -> JSONBytesResponse:
+    return JSONBytesResponse(_active_products_json(db))
+
+
+@router.get("/suggest", response_model=List[ProductSuggestion])
+def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+) -> JSONBytesResponse:
+    """Suggestions de titres pendant la frappe, tolérantes aux fautes de saisie."""
+    return trusted_json(_suggestion_list, _search_index(db).search(q, limit=limit))
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)) -> Product:
-    product = db.query(Product).filter(Product.id == product_id, Product.is_active.is_(True)).first()
+def get_product(product_id: int, db: Session = Depends(get_read_db)) -> JSONBytesResponse:
+    cached = catalog_cache.get(("product", product_id))
+    if cached is not None:
+        return JSONBytesResponse(cached)
+    product = db.execute(active_product_by_id, {"product_id": product_id}).scalar_one_or_none()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produit introuvable")
-    return product
+    result = ProductResponse.model_validate(product).model_dump_json().encode()
+    catalog_cache.set(("product", product_id), result)
+    return JSONBytesResponse(result)
+
+
+@router.get("/{product_id}/recommendations", response_model=List[ProductResponse])
+def get_recommendations(product_id: int, db: Session = Depends(get_read_db)) -> JSONBytesResponse:
+    """Produits les plus souvent achetés avec celui-ci (top-K précalculé, en mémoire)."""
+    catalog = _active_products_by_id(db)
+    if product_id not in catalog:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produit introuvable")
+    return trusted_json(
+        _product_list, [catalog[other_id] for other_id in recommendations.top_k(db, product_id) if other_id in catalog]
+    )
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
@@ -132,19 +235,17 @@ async def upload_cover(
     if file.content_type not in allowed:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format d'image non supporté")
 
-    covers_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "media", "covers")
-    os.makedirs(covers_dir, exist_ok=True)
-
     ext = os.path.splitext(file.filename or "")[1].lower() or ".png"
-    name = f"{_slugify(product.title)}-{uuid.uuid4().hex[:8]}{ext}"
-    disk_path = os.path.join(covers_dir, name)
+    key = f"covers/{_slugify(product.title)}-{uuid.uuid4().hex[:8]}{ext}"
 
     contents = await file.read()
-    with open(disk_path, "wb") as f:
-        f.write(contents)
+    # Écriture (disque ou bucket) hors de la boucle d'événements, dans la cloison dédiée aux fichiers
+    await bulkheads["files"].run(storage.write, key, contents, file.content_type)
 
-    product.cover_image_url = f"/static/covers/{name}"
+    product.cover_image_url = storage.public_url(key)
     db.commit()
     db.refresh(product)
     return product
 
+
+warmup.register_step("catalog", warm_catalog, replicas=True)
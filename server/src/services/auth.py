@@ -7,10 +7,12 @@ import jwt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from src.db.database import get_db
-from src.models.user import User
+from src.db.statements import active_user_by_id
+from src.services.cache import user_cache
 
 
 load_dotenv()
@@ -22,6 +24,20 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRES_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES_MINUTES", "30"))
 
 
+class CurrentUser(BaseModel):
+    """Utilisateur authentifié : copie immuable, partagée sans risque entre les threads via `user_cache`."""
+
+    id: int
+    email: str
+    first_name: str | None = None
+    last_name: str | None = None
+    role: str
+
+    class Config:
+        frozen = True
+        from_attributes = True
+
+
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
@@ -44,7 +60,7 @@ def create_access_token(user_id: int, role: str) -> str:
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
     db: Session = Depends(get_db),
-) -> User:
+) -> CurrentUser:
     token = credentials.credentials
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -61,17 +77,24 @@ def get_current_user(
             detail="Token invalide",
         )
 
-    user = db.query(User).filter(User.id == int(user_id), User.is_active.is_(True)).first()
+    user = user_cache.get(int(user_id))
+    if user is not None:
+        return user
+
+    user = db.execute(active_user_by_id, {"user_id": int(user_id)}).scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Utilisateur non trouvé ou inactif",
         )
 
-    return user
+    # Le cache garde une copie immuable, jamais l'instance ORM de la session
+    current_user = CurrentUser.model_validate(user)
+    user_cache.set(current_user.id, current_user)
+    return current_user
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
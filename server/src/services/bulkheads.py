@@ -0,0 +1,210 @@
+"""Cloisons (bulkheads) : un pool de threads nommé par classe de ressource pour les routes synchrones.
+
+Par défaut, toutes les routes `def` partagent le même limiteur AnyIO (~40 threads) : un appel Stripe lent
+ou une rafale bcrypt l'épuise pour tout le monde. Chaque routeur choisit ici son limiteur via
+`route_class=bulkhead_route("stripe")` ; au-delà de la file d'attente autorisée, la requête échoue
+immédiatement en 503 au lieu de bloquer. Les dépendances synchrones de ces routes (`get_db`,
+`get_read_db`, `get_current_user`…) s'exécutent dans la même cloison que l'endpoint : un pool de
+connexions bloqué ou un Stripe lent n'atteint plus le limiteur partagé.
+"""
+import dataclasses
+import functools
+import inspect
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+
+import anyio
+from fastapi import HTTPException, params, status
+from fastapi.routing import APIRoute
+
+from src.services.metrics import register_collector
+
+
+# nom:capacité[:file_max], séparés par des virgules
+BULKHEADS = os.getenv("BULKHEADS", "auth:8,stripe:16,db:24,files:4")
+BULKHEAD_MAX_QUEUE = int(os.getenv("BULKHEAD_MAX_QUEUE", "64"))
+BULKHEAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Les jetons sont pris sur le limiteur de la cloison ; l'exécution elle-même n'est pas limitée une seconde fois
+_unbounded = None
+
+
+def _unbounded_limiter() -> anyio.CapacityLimiter:
+    global _unbounded
+    if _unbounded is None:
+        _unbounded = anyio.CapacityLimiter(math.inf)
+    return _unbounded
+
+
+class Bulkhead:
+    def __init__(self, name: str, capacity: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._limiter: anyio.CapacityLimiter | None = None
+        self._stats_lock = threading.Lock()
+        # Une seule enveloppe par dépendance : FastAPI met en cache par fonction (une session par requête)
+        self._dependencies: dict[int, tuple[object, object]] = {}
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        # Créé à la demande : un CapacityLimiter doit naître dans la boucle d'événements
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.capacity)
+        return self._limiter
+
+    def _reject(self) -> HTTPException:
+        with self._stats_lock:
+            self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service momentanément surchargé, réessayez dans un instant",
+            headers={"Retry-After": "1"},
+        )
+
+    async def run(self, func, *args, **kwargs):
+        limiter = self.limiter
+        if limiter.statistics().tasks_waiting >= self.max_queue:
+            raise self._reject()
+        queued_at = time.monotonic()
+        try:
+            with anyio.fail_after(self.queue_timeout):
+                await limiter.acquire()
+        except TimeoutError:
+            raise self._reject()
+        waited = time.monotonic() - queued_at
+        try:
+            return await anyio.to_thread.run_sync(
+                functools.partial(func, *args, **kwargs),
+                limiter=_unbounded_limiter(),
+            )
+        finally:
+            limiter.release()
+            with self._stats_lock:
+                self.completed += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> dict:
+        stats = self._limiter.statistics() if self._limiter is not None else None
+        return {
+            "capacity": self.capacity,
+            "in_use": stats.borrowed_tokens if stats else 0,
+            "waiting": stats.tasks_waiting if stats else 0,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.wait_total / self.completed * 1000, 3) if self.completed else 0.0,
+            "queue_wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def _parse(spec: str) -> dict[str, Bulkhead]:
+    result = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        fields = part.strip().split(":")
+        name, capacity = fields[0], int(fields[1])
+        max_queue = int(fields[2]) if len(fields) > 2 else BULKHEAD_MAX_QUEUE
+        result[name] = Bulkhead(name, capacity, max_queue, BULKHEAD_QUEUE_TIMEOUT_SECONDS)
+    return result
+
+
+bulkheads = _parse(BULKHEADS)
+
+register_collector("bulkheads", lambda: {name: b.snapshot() for name, b in bulkheads.items()})
+
+
+def bulkhead_route(name: str) -> type[APIRoute]:
+    """Classe de route qui exécute les endpoints synchrones et leurs dépendances dans la cloison `name`."""
+    bulkhead = bulkheads[name]
+
+    class BulkheadRoute(APIRoute):
+        def __init__(self, path: str, endpoint, **kwargs) -> None:
+            super().__init__(path, _wrap(endpoint, bulkhead), **kwargs)
+
+    BulkheadRoute.__name__ = f"BulkheadRoute_{name}"
+    return BulkheadRoute
+
+
+def _is_async(call) -> bool:
+    call = inspect.unwrap(call)
+    if not inspect.isroutine(call) and not inspect.isclass(call):
+        call = getattr(call, "__call__", call)  # instance appelable (ex. HTTPBearer)
+    return inspect.iscoroutinefunction(call) or inspect.isasyncgenfunction(call)
+
+
+def _is_generator(call) -> bool:
+    return inspect.isgeneratorfunction(inspect.unwrap(call))
+
+
+def _signature(call, bulkhead: Bulkhead) -> inspect.Signature:
+    """Signature de `call` où chaque `Depends(f)` synchrone pointe vers `f` exécutée dans la cloison."""
+    signature = inspect.signature(call)
+    parameters = []
+    for parameter in signature.parameters.values():
+        depends = parameter.default
+        if isinstance(depends, params.Depends) and depends.dependency is not None:
+            dependency = _wrap_dependency(depends.dependency, bulkhead)
+            parameter = parameter.replace(default=dataclasses.replace(depends, dependency=dependency))
+        parameters.append(parameter)
+    return signature.replace(parameters=parameters)
+
+
+def _wrap(endpoint, bulkhead: Bulkhead):
+    # functools.wraps conserve nom et documentation ; la signature (dépendances enveloppées) est fixée à part
+    if _is_async(endpoint):
+        @functools.wraps(endpoint)
+        async def run_in_bulkhead(*args, **kwargs):
+            return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        async def run_in_bulkhead(*args, **kwargs):
+            return await bulkhead.run(endpoint, *args, **kwargs)
+
+    run_in_bulkhead.__signature__ = _signature(endpoint, bulkhead)
+    return run_in_bulkhead
+
+
+def _wrap_dependency(dependency, bulkhead: Bulkhead):
+    # Les dépendances async (ex. HTTPBearer) restent sur la boucle d'événements
+    if _is_async(dependency):
+        return dependency
+    cached = bulkhead._dependencies.get(id(dependency))
+    if cached is not None and cached[0] is dependency:
+        return cached[1]
+
+    if _is_generator(dependency):
+        # Même protocole que FastAPI (contextmanager exécuté dans un thread) ; la fermeture (retour de la
+        # connexion au pool) ne prend pas de jeton : elle ne doit jamais être refusée ni attendre la file
+        async def run_in_bulkhead(**kwargs):
+            manager = contextmanager(dependency)(**kwargs)
+            value = await bulkhead.run(manager.__enter__)
+            try:
+                yield value
+            except Exception as e:
+                if not await anyio.to_thread.run_sync(
+                    manager.__exit__, type(e), e, e.__traceback__, limiter=_unbounded_limiter()
+                ):
+                    raise
+            else:
+                await anyio.to_thread.run_sync(manager.__exit__, None, None, None, limiter=_unbounded_limiter())
+    else:
+        async def run_in_bulkhead(**kwargs):
+            return await bulkhead.run(dependency, **kwargs)
+
+    # Pas de __wrapped__ : FastAPI suivrait la chaîne et traiterait l'enveloppe comme synchrone
+    run_in_bulkhead.__name__ = getattr(dependency, "__name__", type(dependency).__name__)
+    run_in_bulkhead.__qualname__ = getattr(dependency, "__qualname__", run_in_bulkhead.__name__)
+    run_in_bulkhead.__doc__ = dependency.__doc__
+    run_in_bulkhead.__signature__ = _signature(dependency, bulkhead)
+    bulkhead._dependencies[id(dependency)] = (dependency, run_in_bulkhead)
+    return run_in_bulkhead
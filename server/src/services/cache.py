@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LocalCache:
+    """Cache mémoire propre au processus, borné (LRU) et à durée de vie limitée.
+
+    Chaque worker uvicorn possède sa propre copie ; la cohérence entre workers passe
+    par `src.services.invalidation` (LISTEN/NOTIFY PostgreSQL).
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 1024) -> None:
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Supprime une entrée, ou tout le cache si `key` vaut None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+_caches: dict[str, LocalCache] = {}
+
+
+def register_cache(name: str, ttl_seconds: float, max_entries: int = 1024) -> LocalCache:
+    cache = _caches.get(name)
+    if cache is None:
+        cache = LocalCache(name, ttl_seconds, max_entries)
+        _caches[name] = cache
+    return cache
+
+
+def invalidate_local(name: str, key: Hashable | None = None) -> None:
+    cache = _caches.get(name)
+    if cache is not None:
+        cache.invalidate(key)
+
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+catalog_cache = register_cache("catalog", CATALOG_CACHE_TTL_SECONDS, max_entries=4096)
+user_cache = register_cache("users", USER_CACHE_TTL_SECONDS, max_entries=10000)
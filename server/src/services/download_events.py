@@ -0,0 +1,148 @@
+"""Journal des téléchargements (table `downloads`) écrit en différé, hors du chemin de la requête.
+
+`record()` ne fait que déposer l'événement dans une file bornée en mémoire ; un thread par worker
+l'écrit par INSERT multi-lignes toutes les DOWNLOAD_EVENTS_FLUSH_MS ou dès DOWNLOAD_EVENTS_BATCH_SIZE
+événements. File pleine : la requête attend au plus DOWNLOAD_EVENTS_ENQUEUE_TIMEOUT_MS, puis
+l'événement est abandonné et compté (`dropped` dans /metrics). À l'arrêt, la file est vidée en base.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from src.db.database import engine
+from src.models.download import Download
+from src.services.metrics import register_collector
+
+
+DOWNLOAD_EVENTS_FLUSH_MS = int(os.getenv("DOWNLOAD_EVENTS_FLUSH_MS", "500"))
+DOWNLOAD_EVENTS_BATCH_SIZE = int(os.getenv("DOWNLOAD_EVENTS_BATCH_SIZE", "200"))
+DOWNLOAD_EVENTS_BUFFER_SIZE = int(os.getenv("DOWNLOAD_EVENTS_BUFFER_SIZE", "10000"))
+DOWNLOAD_EVENTS_ENQUEUE_TIMEOUT_MS = int(os.getenv("DOWNLOAD_EVENTS_ENQUEUE_TIMEOUT_MS", "50"))
+
+
+class DownloadEventBuffer:
+    def __init__(
+        self,
+        flush_ms: int = DOWNLOAD_EVENTS_FLUSH_MS,
+        batch_size: int = DOWNLOAD_EVENTS_BATCH_SIZE,
+        buffer_size: int = DOWNLOAD_EVENTS_BUFFER_SIZE,
+        enqueue_timeout_ms: int = DOWNLOAD_EVENTS_ENQUEUE_TIMEOUT_MS,
+    ) -> None:
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=buffer_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    def record(self, user_id: int, product_id: int, order_id: int | None) -> bool:
+        """Dépose un événement ; renvoie False s'il a été abandonné (file pleine)."""
+        event = {
+            "user_id": user_id,
+            "product_id": product_id,
+            "order_id": order_id,
+            "downloaded_at": datetime.utcnow(),
+        }
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="download-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Arrête le thread après avoir écrit tout ce qui reste dans la file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            elif self._stop.is_set():
+                return
+
+    def _collect(self) -> list[dict]:
+        """Attend un premier événement, puis complète le lot jusqu'à la taille ou l'échéance."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # À l'arrêt, on vide la file sans attendre l'échéance
+            remaining = 0.0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list[dict]) -> None:
+        started = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Download), batch)  # une seule requête INSERT ... VALUES multi-lignes
+        except Exception as e:
+            with self._stats_lock:
+                self.failed += len(batch)
+            print(f"Warning: download events flush failed ({len(batch)} lost): {e}", file=sys.stderr)
+            return
+        with self._stats_lock:
+            self.written += len(batch)
+            self.flushes += 1
+            self.last_flush_ms = round((time.monotonic() - started) * 1000, 3)
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_flush_ms": self.last_flush_ms,
+            }
+
+
+def download_count(db: Session, user_id: int, product_id: int, since: datetime | None = None) -> int:
+    """Téléchargements enregistrés pour ce couple utilisateur/produit (hors événements encore en file)."""
+    stmt = select(func.count()).select_from(Download).where(
+        Download.user_id == user_id,
+        Download.product_id == product_id,
+    )
+    if since is not None:
+        stmt = stmt.where(Download.downloaded_at >= since)
+    return db.execute(stmt).scalar_one()
+
+
+download_events = DownloadEventBuffer()
+
+register_collector("download_events", download_events.snapshot)
@@ -0,0 +1,170 @@
+"""Canal de cohérence des caches entre workers (PostgreSQL LISTEN/NOTIFY).
+
+Toute session qui modifie un produit ou un utilisateur émet un NOTIFY dans sa transaction :
+PostgreSQL ne le diffuse qu'au commit (jamais en cas de rollback). Chaque worker écoute le canal
+dans un thread dédié et vide les entrées concernées de ses caches locaux.
+"""
+import os
+import select
+import sys
+import threading
+
+from sqlalchemy import event, text
+
+from src.db.database import SessionLocal, engine, replica_router
+from src.services.cache import _caches, invalidate_local
+
+
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+# Pilotes dont l'API de notification est prise en charge par l'écoute
+LISTEN_DRIVERS = ("psycopg2", "psycopg")
+
+_notify_sql = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _targets_for(instance) -> list[tuple[str, object]]:
+    # Import local : les modèles importent `Base` depuis src.db.database
+    from src.models.product import Product
+    from src.models.user import User
+
+    if isinstance(instance, Product):
+        return [("catalog", None)]
+    if isinstance(instance, User):
+        return [("users", instance.id)]
+    return []
+
+
+def _encode(name: str, key) -> str:
+    return f"{name}:{'' if key is None else key}"
+
+
+def _decode(payload: str) -> tuple[str, object]:
+    name, _, key = payload.partition(":")
+    if not key:
+        return name, None
+    return name, int(key) if key.isdigit() else key
+
+
+def _invalidate(name: str, key) -> None:
+    invalidate_local(name, key)
+    # Le rechargement qui suit lit le primaire : un réplica peut ne pas avoir encore rejoué l'écriture
+    replica_router.prefer_primary()
+
+
+def invalidate_on_commit(session, targets) -> None:
+    """Programme l'invalidation de `targets` [(cache, clé)] sur tous les workers au commit de `session`.
+
+    Pour les écritures qui ne passent pas par des instances ORM (upserts en SQL direct, etc.).
+    """
+    targets = set(targets)
+    if not targets:
+        return
+    session.info.setdefault("cache_invalidations", set()).update(targets)
+    if session.bind is not None and session.bind.dialect.name == "postgresql":
+        connection = session.connection()
+        for name, key in targets:
+            connection.execute(_notify_sql, {"channel": CACHE_INVALIDATION_CHANNEL, "payload": _encode(name, key)})
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_invalidations(session, flush_context) -> None:
+    targets = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        targets.update(_targets_for(instance))
+    invalidate_on_commit(session, targets)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_local_invalidations(session) -> None:
+    # Le worker qui écrit n'attend pas l'aller-retour NOTIFY pour ses propres caches
+    for name, key in session.info.pop("cache_invalidations", ()):
+        _invalidate(name, key)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_invalidations(session) -> None:
+    session.info.pop("cache_invalidations", None)
+
+
+class InvalidationListener:
+    """Thread d'écoute du canal NOTIFY ; se reconnecte et vide tous les caches après une coupure."""
+
+    def __init__(self, channel: str = CACHE_INVALIDATION_CHANNEL, poll_timeout: float = 1.0) -> None:
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        if engine.dialect.driver not in LISTEN_DRIVERS:
+            # Sans écoute, chaque worker garderait ses caches jusqu'à expiration après une écriture ailleurs
+            message = (
+                f"cache invalidation: driver {engine.dialect.driver!r} cannot LISTEN, "
+                "use postgresql:// (psycopg 3)"
+            )
+            print(f"Error: {message}", file=sys.stderr)
+            raise RuntimeError(message)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_timeout * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 0.5
+            except Exception as e:
+                print(f"Warning: cache invalidation listener: {e}", file=sys.stderr)
+            finally:
+                self.connected.clear()
+            # Notifications possiblement manquées pendant la coupure : on repart de caches vides
+            for cache in _caches.values():
+                cache.invalidate()
+            replica_router.prefer_primary()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _listen(self) -> None:
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # connexion dédiée, hors du pool
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            self.connected.set()
+            while not self._stop.is_set():
+                for payload in self._receive(conn):
+                    _invalidate(*_decode(payload))
+        finally:
+            conn.close()
+
+    def _receive(self, conn):
+        """Charges utiles reçues, au fil de l'eau, pendant au plus `poll_timeout` secondes."""
+        if engine.dialect.driver == "psycopg":
+            # psycopg 3 : générateur bloquant, interrompu au bout du délai
+            for notify in conn.notifies(timeout=self.poll_timeout):
+                yield notify.payload
+            return
+        # psycopg2 : attente sur le descripteur, puis file `notifies` remplie par poll()
+        if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+            return
+        conn.poll()
+        while conn.notifies:
+            yield conn.notifies.pop(0).payload
+
+listener = InvalidationListener()
@@ -0,0 +1,100 @@
+"""Tâches de fond périodiques exécutées dans chaque worker (thread démon démarré par le lifespan).
+
+Une tâche qui ne doit tourner qu'une fois pour tout le déploiement définit `single_runner` : chaque
+worker tente à chaque échéance de prendre un verrou consultatif PostgreSQL (pg_try_advisory_lock) sur
+une connexion dédiée ; seul celui qui le tient exécute les passes. Le verrou tombe avec sa connexion :
+si ce worker s'arrête, un autre prend le relais à l'échéance suivante.
+"""
+import abc
+import sys
+import threading
+import zlib
+
+from src.db.database import engine
+
+
+class PeriodicJob(abc.ABC):
+    """Appelle `run_once()` toutes les `interval_seconds` ; une erreur est journalisée puis la boucle continue."""
+
+    name = "job"
+    single_runner = False
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self._lock_conn = None
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    @property
+    def leader(self) -> bool:
+        return not self.single_runner or self._lock_conn is not None
+
+    @abc.abstractmethod
+    def run_once(self) -> dict:
+        """Une passe ; renvoie son bilan."""
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._release()
+
+    def _elect(self) -> bool:
+        """Vrai si ce worker doit exécuter la passe (verrou tenu ou pris à l'instant)."""
+        if not self.single_runner or engine.dialect.name != "postgresql":
+            return True
+        if self._lock_conn is not None:
+            try:
+                with self._lock_conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                return True
+            except Exception:
+                self._release()  # connexion perdue : le verrou l'est aussi
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # connexion dédiée, hors du pool : elle porte le verrou
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (zlib.crc32(self.name.encode()),))
+                acquired = cursor.fetchone()[0]
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._lock_conn = conn
+        return True
+
+    def _release(self) -> None:
+        conn, self._lock_conn = self._lock_conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                if self._elect():
+                    self.run_once()
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                print(f"Warning: {self.name}: {e}", file=sys.stderr)
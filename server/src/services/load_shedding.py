@@ -0,0 +1,171 @@
+"""Délestage adaptatif : refuser vite (503) le trafic secondaire quand le worker ou la base saturent.
+
+Deux signaux, relevés toutes les LOAD_SHED_PROBE_MS par une tâche de la boucle d'événements :
+- le retard de la boucle (une tâche qui dort N ms et se réveille en retard : CPU saturé, appel bloquant) ;
+- l'attente des checkouts du pool SQLAlchemy (`pool_waits`), attentes encore en cours comprises :
+  une base lente se voit dès que les requêtes s'empilent dans la file du pool.
+Chaque signal est lissé (moyenne mobile exponentielle) et rapporté à son seuil ; la pression est le
+plus grand des deux rapports. Pression ≥ 1 : le trafic "low" (catalogue, suggestions, exports,
+statistiques) est refusé ; pression ≥ LOAD_SHED_NORMAL_FACTOR : le trafic "normal" (devis, écritures
+admin du catalogue…) aussi. Le trafic
+"critical" (paiement, webhooks Stripe, création de commande) n'est jamais délesté. Un niveau atteint
+est maintenu au moins LOAD_SHED_HOLD_SECONDS pour éviter d'osciller.
+"""
+import asyncio
+import os
+import sys
+import time
+
+from src.db.database import pool_waits
+from src.services.metrics import register_collector
+
+
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "1") == "1"
+LOAD_SHED_LOOP_LAG_MS = float(os.getenv("LOAD_SHED_LOOP_LAG_MS", "100"))
+LOAD_SHED_POOL_WAIT_MS = float(os.getenv("LOAD_SHED_POOL_WAIT_MS", "250"))
+LOAD_SHED_NORMAL_FACTOR = float(os.getenv("LOAD_SHED_NORMAL_FACTOR", "2"))
+LOAD_SHED_HOLD_SECONDS = float(os.getenv("LOAD_SHED_HOLD_SECONDS", "2"))
+LOAD_SHED_PROBE_MS = float(os.getenv("LOAD_SHED_PROBE_MS", "50"))
+LOAD_SHED_SMOOTHING = 0.3  # poids du dernier relevé dans la moyenne mobile
+# [MÉTHODE ]préfixe:priorité, séparés par des virgules ; le préfixe le plus long l'emporte, "normal" par défaut
+LOAD_SHED_PRIORITIES = os.getenv(
+    "LOAD_SHED_PRIORITIES",
+    "/payments:critical,POST /orders/:critical,POST /orders/quote:normal,/auth:normal,/downloads:normal,/orders:normal,"
+    "/orders/export:low,/products:low,POST /products:normal,PUT /products:normal,DELETE /products:normal,"
+    "/admin:low,/static:low",
+)
+
+PRIORITIES = ("low", "normal", "critical")
+# Sondes de la plateforme et métriques : toujours servies
+EXEMPT_PATHS = ("/health", "/ready", "/metrics")
+
+
+def _parse_priorities(spec: str) -> list[tuple[str | None, str, str]]:
+    rules = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        route, priority = part.strip().rsplit(":", 1)
+        if priority not in PRIORITIES:
+            raise ValueError(f"LOAD_SHED_PRIORITIES : priorité inconnue {priority!r}")
+        method, _, prefix = route.strip().rpartition(" ")
+        rules.append((method.upper() or None, prefix, priority))
+    # Préfixe le plus long d'abord ; à longueur égale, une règle avec méthode passe avant une règle sans
+    rules.sort(key=lambda rule: (len(rule[1]), rule[0] is not None), reverse=True)
+    return rules
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        rules: list[tuple[str | None, str, str]],
+        loop_lag_ms: float = LOAD_SHED_LOOP_LAG_MS,
+        pool_wait_ms: float = LOAD_SHED_POOL_WAIT_MS,
+        normal_factor: float = LOAD_SHED_NORMAL_FACTOR,
+        hold_seconds: float = LOAD_SHED_HOLD_SECONDS,
+        probe_ms: float = LOAD_SHED_PROBE_MS,
+    ) -> None:
+        self.rules = rules
+        self.loop_lag_threshold = loop_lag_ms / 1000
+        self.pool_wait_threshold = pool_wait_ms / 1000
+        self.normal_factor = normal_factor
+        self.hold_seconds = hold_seconds
+        self.probe_interval = probe_ms / 1000
+        self._task: asyncio.Task | None = None
+        # Niveau de délestage : 0 = rien, 1 = "low" refusé, 2 = "low" et "normal" refusés
+        self.level = 0
+        self._level_until = 0.0
+        self.loop_lag = 0.0
+        self.pool_wait = 0.0
+        self.pressure = 0.0
+        self.transitions = 0
+        self.last_shed_at: float | None = None
+        # Compteurs modifiés uniquement depuis la boucle d'événements
+        self.admitted = dict.fromkeys(PRIORITIES, 0)
+        self.shed = dict.fromkeys(PRIORITIES, 0)
+
+    def priority(self, method: str, path: str) -> str:
+        if path.startswith(EXEMPT_PATHS):
+            return "critical"
+        for rule_method, prefix, priority in self.rules:
+            if path.startswith(prefix) and (rule_method is None or rule_method == method):
+                return priority
+        return "normal"
+
+    def admit(self, priority: str) -> bool:
+        if self.level > PRIORITIES.index(priority):
+            self.shed[priority] += 1
+            self.last_shed_at = time.time()
+            return False
+        self.admitted[priority] += 1
+        return True
+
+    def observe(self, loop_lag: float, pool_wait: float, now: float) -> None:
+        """Intègre un relevé (secondes) et recalcule le niveau de délestage."""
+        self.loop_lag += LOAD_SHED_SMOOTHING * (loop_lag - self.loop_lag)
+        self.pool_wait += LOAD_SHED_SMOOTHING * (pool_wait - self.pool_wait)
+        self.pressure = max(self.loop_lag / self.loop_lag_threshold, self.pool_wait / self.pool_wait_threshold)
+        if self.pressure >= self.normal_factor:
+            level = 2
+        elif self.pressure >= 1:
+            level = 1
+        else:
+            level = 0
+        if level >= self.level:
+            if level > 0:
+                self._level_until = now + self.hold_seconds
+        elif now < self._level_until:
+            return
+        if level != self.level:
+            self.level = level
+            self.transitions += 1
+
+    async def start(self) -> None:
+        if not LOAD_SHED_ENABLED or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._probe())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.monotonic() + self.probe_interval
+            await asyncio.sleep(self.probe_interval)
+            now = time.monotonic()
+            try:
+                self.observe(max(now - expected, 0.0), pool_waits.take_max(), now)
+            except Exception as e:
+                print(f"Warning: load shedding probe failed: {e}", file=sys.stderr)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": LOAD_SHED_ENABLED,
+            "level": self.level,
+            "shedding": list(PRIORITIES[: self.level]),
+            "pressure": round(self.pressure, 3),
+            "loop_lag_ms": round(self.loop_lag * 1000, 3),
+            "pool_wait_ms": round(self.pool_wait * 1000, 3),
+            "pool_waiting": pool_waits.waiting(),
+            "thresholds": {
+                "loop_lag_ms": self.loop_lag_threshold * 1000,
+                "pool_wait_ms": self.pool_wait_threshold * 1000,
+                "normal_factor": self.normal_factor,
+            },
+            "transitions": self.transitions,
+            "last_shed_at": self.last_shed_at,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+admission = AdmissionController(_parse_priorities(LOAD_SHED_PRIORITIES))
+
+register_collector("load_shedding", admission.snapshot)
@@ -0,0 +1,13 @@
+from typing import Callable
+
+
+# Sections exposées par GET /metrics : nom -> fonction renvoyant un instantané (dict sérialisable)
+_collectors: dict[str, Callable[[], dict]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], dict]) -> None:
+    _collectors[name] = collector
+
+
+def collect() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
@@ -0,0 +1,123 @@
+"""Purge des commandes abandonnées : 'pending' sans PaymentIntent, créées il y a plus de ORDER_CLEANUP_TTL_HOURS.
+
+Chaque tentative de paiement crée une commande et ses articles ; sans purge, `orders` et `order_items`
+(et leurs index, dont celui sur `user_id`) grossissent indéfiniment. La suppression avance par petits
+lots ordonnés par id (pagination par clé, sans OFFSET), un lot par transaction courte, avec une pause
+entre deux lots pour laisser les réplicas rattraper. FOR UPDATE SKIP LOCKED permet à plusieurs workers de
+purger ensemble et laisse de côté une commande en cours de paiement : create-intent verrouille la
+commande (FOR UPDATE) avant l'appel Stripe et jusqu'à l'enregistrement du PaymentIntent. Si la purge
+l'a prise en premier, create-intent attend la fin du lot et répond 404 : aucun paiement orphelin.
+
+Les agrégats `daily_product_sales` conservent les tentatives purgées ; un recalcul
+(scripts/backfill_sales_rollups.py) sur des jours déjà purgés ne compterait plus que les commandes restantes.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from src.db.database import SessionLocal
+from src.models.order import Order, OrderItem
+from src.services.jobs import PeriodicJob
+from src.services.metrics import register_collector
+
+
+ORDER_CLEANUP_INTERVAL_SECONDS = float(os.getenv("ORDER_CLEANUP_INTERVAL_SECONDS", "3600"))  # 0 = désactivé
+ORDER_CLEANUP_TTL_HOURS = int(os.getenv("ORDER_CLEANUP_TTL_HOURS", "72"))
+ORDER_CLEANUP_CHUNK_SIZE = int(os.getenv("ORDER_CLEANUP_CHUNK_SIZE", "500"))
+ORDER_CLEANUP_PAUSE_SECONDS = float(os.getenv("ORDER_CLEANUP_PAUSE_SECONDS", "0.05"))
+
+
+def _abandoned(cutoff: datetime):
+    return (
+        Order.status == "pending",
+        Order.stripe_payment_intent_id.is_(None),
+        Order.created_at < cutoff,
+    )
+
+
+def _delete_chunk(cutoff: datetime, after_id: int, chunk_size: int) -> tuple[list[int], int]:
+    """Supprime un lot de commandes d'id > `after_id` ; renvoie (ids supprimés, articles supprimés)."""
+    with SessionLocal() as db:
+        ids = list(
+            db.scalars(
+                select(Order.id)
+                .where(*_abandoned(cutoff), Order.id > after_id)
+                .order_by(Order.id)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        if not ids:
+            return [], 0
+        items = db.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids))).rowcount
+        db.execute(delete(Order).where(Order.id.in_(ids)))
+        db.commit()
+    return ids, items
+
+
+class OrderCleaner(PeriodicJob):
+    name = "order-cleanup"
+
+    def __init__(self, interval_seconds: float = ORDER_CLEANUP_INTERVAL_SECONDS) -> None:
+        super().__init__(interval_seconds)
+        self.runs = 0
+        self.orders_deleted = 0
+        self.items_deleted = 0
+        self.chunks = 0
+        self.last_run_at: float | None = None
+        self.last_duration_ms = 0.0
+        self.total_duration_ms = 0.0
+
+    def run_once(
+        self,
+        now: datetime | None = None,
+        chunk_size: int = ORDER_CLEANUP_CHUNK_SIZE,
+        pause_seconds: float = ORDER_CLEANUP_PAUSE_SECONDS,
+    ) -> dict:
+        """Purge tout l'arriéré par lots ; renvoie le bilan de la passe."""
+        started = time.monotonic()
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=ORDER_CLEANUP_TTL_HOURS)
+        result = {"orders_deleted": 0, "items_deleted": 0, "chunks": 0}
+        after_id = 0
+        while not self._stop.is_set():
+            ids, items = _delete_chunk(cutoff, after_id, chunk_size)
+            if not ids:
+                break
+            after_id = ids[-1]
+            result["orders_deleted"] += len(ids)
+            result["items_deleted"] += items
+            result["chunks"] += 1
+            if len(ids) < chunk_size or self._stop.wait(pause_seconds):
+                break
+        duration_ms = round((time.monotonic() - started) * 1000, 3)
+        result["duration_ms"] = duration_ms
+        with self._stats_lock:
+            self.runs += 1
+            self.orders_deleted += result["orders_deleted"]
+            self.items_deleted += result["items_deleted"]
+            self.chunks += result["chunks"]
+            self.last_run_at = time.time()
+            self.last_duration_ms = duration_ms
+            self.total_duration_ms += duration_ms
+        return result
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "runs": self.runs,
+                "errors": self.errors,
+                "orders_deleted": self.orders_deleted,
+                "items_deleted": self.items_deleted,
+                "chunks": self.chunks,
+                "last_run_at": self.last_run_at,
+                "last_duration_ms": self.last_duration_ms,
+                "total_duration_ms": round(self.total_duration_ms, 3),
+            }
+
+
+cleaner = OrderCleaner()
+
+register_collector("order_cleanup", cleaner.snapshot)
@@ -0,0 +1,29 @@
+"""Transitions d'état des commandes et mises à jour incrémentales qui en dépendent."""
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.order import Order
+from src.services import recommendations, sales_rollups
+
+
+def mark_order_paid(db: Session, order: Order) -> bool:
+    """Passe la commande en 'paid' (sans commit) ; renvoie False si elle l'était déjà.
+
+    L'UPDATE conditionnel garantit qu'une seule transaction effectue la transition, même si le
+    webhook et confirm-paid arrivent en même temps. Les index dérivés des ventes sont mis à jour
+    dans la même transaction.
+    """
+    result = db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status != "paid")
+        .values(status="paid")
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return False
+    set_committed_value(order, "status", "paid")
+    product_ids = {item.product_id for item in order.items}
+    recommendations.record_paid_order(db, product_ids)
+    sales_rollups.record_order_paid(db, order)
+    return True
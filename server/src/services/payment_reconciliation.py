@@ -0,0 +1,171 @@
+"""Réconciliation des commandes restées 'pending' alors que Stripe a tranché (webhook perdu).
+
+Une passe : lecture des commandes en attente depuis plus de PAYMENT_RECONCILE_MIN_AGE_MINUTES
+(index (status, created_at)), puis parcours de l'API de liste des PaymentIntents créés depuis la plus
+ancienne d'entre elles — quelques appels paginés au lieu d'un `retrieve` par commande — et enfin
+application des transitions par lots, chaque lot dans sa transaction avec FOR UPDATE SKIP LOCKED :
+une commande verrouillée par le webhook ou confirm-paid est simplement sautée.
+Chaque passe lit au plus PAYMENT_RECONCILE_SCAN_LIMIT commandes et reprend après la dernière vue
+(curseur (created_at, id)) : des commandes qui restent en attente indéfiniment (carte jamais saisie)
+n'empêchent pas d'examiner les suivantes. Un seul worker exécute les passes (verrou consultatif).
+"""
+import calendar
+import os
+import time
+from datetime import datetime, timedelta
+
+import stripe
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+
+from src.db.database import SessionLocal
+from src.models.order import Order
+from src.services.jobs import PeriodicJob
+from src.services.metrics import register_collector
+from src.services.order_events import mark_order_paid
+from src.services.stripe_config import STRIPE_SECRET_KEY
+
+
+PAYMENT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "300"))  # 0 = désactivé
+PAYMENT_RECONCILE_MIN_AGE_MINUTES = int(os.getenv("PAYMENT_RECONCILE_MIN_AGE_MINUTES", "15"))
+PAYMENT_RECONCILE_MAX_AGE_HOURS = int(os.getenv("PAYMENT_RECONCILE_MAX_AGE_HOURS", "72"))
+PAYMENT_RECONCILE_SCAN_LIMIT = int(os.getenv("PAYMENT_RECONCILE_SCAN_LIMIT", "1000"))
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", "100"))
+
+STRIPE_LIST_PAGE_SIZE = 100  # maximum accepté par Stripe
+
+# Statut Stripe définitif -> statut de commande
+_TERMINAL_STATUSES = {"succeeded": "paid", "canceled": "failed"}
+
+
+def _timestamp(value: datetime) -> int:
+    # created_at est stocké en UTC naïf (datetime.utcnow)
+    return calendar.timegm(value.utctimetuple())
+
+
+def _stuck_orders(now: datetime, after: tuple[datetime, int] | None = None) -> list:
+    """Commandes en attente de la fenêtre, dans l'ordre (created_at, id), strictement après `after`."""
+    query = select(Order.id, Order.stripe_payment_intent_id, Order.created_at).where(
+        Order.status == "pending",
+        Order.created_at < now - timedelta(minutes=PAYMENT_RECONCILE_MIN_AGE_MINUTES),
+        Order.created_at >= now - timedelta(hours=PAYMENT_RECONCILE_MAX_AGE_HOURS),
+        Order.stripe_payment_intent_id.isnot(None),
+    )
+    if after is not None:
+        query = query.where(tuple_(Order.created_at, Order.id) > tuple_(*after))
+    with SessionLocal() as db:
+        return db.execute(
+            query.order_by(Order.created_at, Order.id).limit(PAYMENT_RECONCILE_SCAN_LIMIT)
+        ).all()
+
+
+def _intent_statuses(wanted: set[str], since: datetime) -> tuple[dict[str, str], int]:
+    """Statuts des PaymentIntents `wanted`, lus par pages de la liste Stripe ; renvoie aussi le nombre de pages."""
+    statuses: dict[str, str] = {}
+    page = stripe.PaymentIntent.list(limit=STRIPE_LIST_PAGE_SIZE, created={"gte": _timestamp(since)})
+    pages = 1
+    while True:
+        for intent in page.data:
+            if intent.id in wanted:
+                statuses[intent.id] = intent.status
+        # La liste va du plus récent au plus ancien : on s'arrête dès que tout est trouvé
+        if len(statuses) == len(wanted) or not page.has_more:
+            return statuses, pages
+        page = page.next_page()
+        pages += 1
+
+
+def _apply_batch(transitions: dict[int, str]) -> tuple[int, int, int]:
+    """Applique {order_id: statut cible} en une transaction ; renvoie (payées, échouées, sautées)."""
+    paid = failed = 0
+    with SessionLocal() as db:
+        orders = db.scalars(
+            select(Order)
+            .where(Order.id.in_(transitions), Order.status == "pending")
+            .options(selectinload(Order.items))
+            .with_for_update(skip_locked=True)
+        ).all()
+        for order in orders:
+            if transitions[order.id] == "paid":
+                paid += mark_order_paid(db, order)
+            else:
+                order.status = "failed"
+                failed += 1
+        db.commit()
+    return paid, failed, len(transitions) - len(orders)
+
+
+class PaymentReconciler(PeriodicJob):
+    """Passes de réconciliation périodiques dans un thread de fond, avec compteurs pour /metrics."""
+
+    name = "payment-reconciliation"
+    # Un appel de liste Stripe par passe et par worker serait multiplié par WEB_CONCURRENCY
+    single_runner = True
+
+    def __init__(self, interval_seconds: float = PAYMENT_RECONCILE_INTERVAL_SECONDS) -> None:
+        super().__init__(interval_seconds)
+        # Dernière commande examinée : la passe suivante reprend après elle, puis repart du début
+        self._cursor: tuple[datetime, int] | None = None
+        self.runs = 0
+        self.stripe_pages = 0
+        self.paid = 0
+        self.failed = 0
+        self.skipped = 0
+        self.last_run_at: float | None = None
+        self.last_duration_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(STRIPE_SECRET_KEY) and super().enabled
+
+    def run_once(self, now: datetime | None = None) -> dict:
+        """Une passe complète ; renvoie le bilan de la passe."""
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        result = {"checked": 0, "stripe_pages": 0, "paid": 0, "failed": 0, "skipped": 0}
+        stuck = _stuck_orders(now, self._cursor)
+        self._cursor = (stuck[-1].created_at, stuck[-1].id) if len(stuck) == PAYMENT_RECONCILE_SCAN_LIMIT else None
+        if stuck:
+            order_by_intent = {intent_id: order_id for order_id, intent_id, _ in stuck}
+            # Un PaymentIntent est créé après sa commande : la plus ancienne commande borne la recherche
+            statuses, result["stripe_pages"] = _intent_statuses(set(order_by_intent), stuck[0].created_at)
+            transitions = [
+                (order_by_intent[intent_id], _TERMINAL_STATUSES[status])
+                for intent_id, status in statuses.items()
+                if status in _TERMINAL_STATUSES
+            ]
+            result["checked"] = len(stuck)
+            for i in range(0, len(transitions), PAYMENT_RECONCILE_BATCH_SIZE):
+                paid, failed, skipped = _apply_batch(dict(transitions[i : i + PAYMENT_RECONCILE_BATCH_SIZE]))
+                result["paid"] += paid
+                result["failed"] += failed
+                result["skipped"] += skipped
+        with self._stats_lock:
+            self.runs += 1
+            self.stripe_pages += result["stripe_pages"]
+            self.paid += result["paid"]
+            self.failed += result["failed"]
+            self.skipped += result["skipped"]
+            self.last_run_at = time.time()
+            self.last_duration_ms = round((time.monotonic() - started) * 1000, 3)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "leader": self.leader,
+                "runs": self.runs,
+                "errors": self.errors,
+                "stripe_pages": self.stripe_pages,
+                "paid": self.paid,
+                "failed": self.failed,
+                "skipped_locked": self.skipped,
+                "last_run_at": self.last_run_at,
+                "last_duration_ms": self.last_duration_ms,
+            }
+
+
+reconciler = PaymentReconciler()
+
+register_collector("payment_reconciliation", reconciler.snapshot)
@@ -0,0 +1,60 @@
+"""Chiffrage des paniers depuis un index des prix : id produit -> (prix en centimes, actif).
+
+Devis (/orders/quote) : l'index vit dans `catalog_cache` ; toute écriture de produit l'invalide sur tous
+les workers (LISTEN/NOTIFY) et il est rechargé par une seule requête sur trois colonnes. Entre deux
+rechargements, chiffrer un panier ne fait aucun aller-retour PostgreSQL.
+Commande (POST /orders/) : jamais depuis le cache, qui peut être en retard (réplica, écoute coupée).
+Prix et statut sont relus sur le primaire dans la transaction de la commande (`current_prices`) ; le client
+qui a affiché un devis peut en joindre le total pour refuser la commande si le prix a changé depuis.
+"""
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.models.product import Product
+from src.services.cache import catalog_cache
+
+
+def price_index(db: Session) -> dict[int, tuple[int, bool]]:
+    cached = catalog_cache.get("prices")
+    if cached is not None:
+        return cached
+    rows = db.execute(select(Product.id, Product.price_cents, Product.is_active)).all()
+    index = {product_id: (price_cents, bool(is_active)) for product_id, price_cents, is_active in rows}
+    catalog_cache.set("prices", index)
+    return index
+
+
+def current_prices(db: Session, product_ids: Iterable[int]) -> dict[int, tuple[int, bool]]:
+    """Prix et statut des produits lus dans la transaction de `db`, verrouillés (FOR SHARE) jusqu'à son commit."""
+    rows = db.execute(
+        select(Product.id, Product.price_cents, Product.is_active)
+        .where(Product.id.in_(set(product_ids)))
+        .with_for_update(read=True)
+    ).all()
+    return {product_id: (price_cents, bool(is_active)) for product_id, price_cents, is_active in rows}
+
+
+def price_cart(
+    index: dict[int, tuple[int, bool]], product_ids: Iterable[int]
+) -> tuple[list[tuple[int, int]], list[int], list[int]]:
+    """Renvoie (lignes (product_id, price_cents), ids inconnus ou inactifs, ids en double).
+
+    Un ebook ne s'achète qu'une fois : les doublons ne sont chiffrés qu'une fois, l'ordre du panier est conservé.
+    """
+    lines: list[tuple[int, int]] = []
+    invalid: list[int] = []
+    duplicates: list[int] = []
+    seen: set[int] = set()
+    for product_id in product_ids:
+        if product_id in seen:
+            duplicates.append(product_id)
+            continue
+        seen.add(product_id)
+        entry = index.get(product_id)
+        if entry is None or not entry[1]:
+            invalid.append(product_id)
+        else:
+            lines.append((product_id, entry[0]))
+    return lines, invalid, duplicates
@@ -0,0 +1,179 @@
+"""Limitation de débit (token bucket) des routes /auth, appliquée avant tout travail bcrypt.
+
+Deux backends :
+- "memory" (défaut) : propre au worker, mémoire bornée, éviction des seaux redevenus pleins ;
+- "postgres" : table UNLOGGED partagée, pour que les limites tiennent entre workers et conteneurs.
+"""
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import text
+
+from src.db.database import engine
+
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | postgres
+# Tentatives par minute et rafale autorisée, par IP et par email
+AUTH_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "20"))
+AUTH_RATE_LIMIT_IP_BURST = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", "10"))
+AUTH_RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_EMAIL_PER_MINUTE", "5"))
+AUTH_RATE_LIMIT_EMAIL_BURST = int(os.getenv("AUTH_RATE_LIMIT_EMAIL_BURST", "5"))
+# Proxys dont X-Forwarded-For est cru : IP ou réseaux (CIDR) séparés par des virgules, "*" pour tout pair
+# (application joignable uniquement via le proxy, ex. Railway). Vide (défaut) : l'IP est celle du pair TCP
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+
+class TokenBucket:
+    """Seaux à jetons en mémoire : un [jetons, dernier_accès] par clé, ordonnés par dernier accès.
+
+    Un seau inactif depuis `burst / rate` secondes est plein, donc équivalent à une clé absente :
+    il est évincé sans perte d'information.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_keys: int = 100_000) -> None:
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self.refill_seconds = burst / rate_per_second
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> float:
+        """Consomme un jeton ; renvoie 0 si autorisé, sinon le délai (s) avant le prochain jeton."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [self.burst - 1.0, now]
+                return 0.0
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+            if tokens >= 1.0:
+                bucket[0] = tokens - 1.0
+                return 0.0
+            bucket[0] = tokens
+            return (1.0 - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if len(buckets) <= self.max_keys and now - bucket[1] < self.refill_seconds:
+                break
+            del buckets[key]
+
+
+_pg_refilled = "LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate)"
+_pg_hit_sql = text(
+    f"""
+    INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+    VALUES (:key, :burst - 1, TRUE, now())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE WHEN {_pg_refilled} >= 1 THEN {_pg_refilled} - 1 ELSE {_pg_refilled} END,
+        allowed = {_pg_refilled} >= 1,
+        updated_at = now()
+    RETURNING b.tokens, b.allowed
+    """
+)
+_pg_evict_sql = text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - make_interval(secs => :age)")
+
+RATE_LIMIT_TABLE_DDL = """
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    key VARCHAR(320) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    allowed BOOLEAN NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+"""
+
+
+class PostgresTokenBucket:
+    """Même algorithme que TokenBucket, calculé atomiquement par PostgreSQL (un upsert par tentative)."""
+
+    def __init__(self, rate_per_second: float, burst: int, evict_every: int = 1000) -> None:
+        self.rate = rate_per_second
+        self.burst = burst
+        self.refill_seconds = burst / rate_per_second
+        self.evict_every = evict_every
+        self._hits = 0
+
+    def hit(self, key: str) -> float:
+        with engine.begin() as conn:
+            tokens, allowed = conn.execute(_pg_hit_sql, {"key": key, "burst": self.burst, "rate": self.rate}).one()
+            self._hits += 1
+            if self._hits % self.evict_every == 0:
+                conn.execute(_pg_evict_sql, {"age": self.refill_seconds})
+        if allowed:
+            return 0.0
+        return (1.0 - tokens) / self.rate
+
+
+def _make_bucket(per_minute: float, burst: int):
+    if RATE_LIMIT_BACKEND == "postgres":
+        return PostgresTokenBucket(per_minute / 60.0, burst)
+    return TokenBucket(per_minute / 60.0, burst)
+
+
+auth_ip_bucket = _make_bucket(AUTH_RATE_LIMIT_IP_PER_MINUTE, AUTH_RATE_LIMIT_IP_BURST)
+auth_email_bucket = _make_bucket(AUTH_RATE_LIMIT_EMAIL_PER_MINUTE, AUTH_RATE_LIMIT_EMAIL_BURST)
+
+
+def _parse_proxies(spec: str) -> list | None:
+    """Réseaux de confiance ; None signifie "tout pair"."""
+    entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+    if "*" in entries:
+        return None
+    return [ipaddress.ip_network(entry, strict=False) for entry in entries]
+
+
+_trusted_proxies = _parse_proxies(TRUSTED_PROXIES)
+
+
+def _is_trusted(host: str) -> bool:
+    if _trusted_proxies is None:
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_proxies)
+
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    # Sans proxy de confiance devant, l'en-tête est fourni par le client : un seau neuf à chaque requête
+    if not forwarded or not _is_trusted(peer):
+        return peer
+    # De droite à gauche : la première adresse qui n'est pas un de nos proxys est celle du client
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if _trusted_proxies is None or not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def enforce_auth_rate_limit(request: Request, email: str) -> None:
+    """Lève une 429 (avec Retry-After) si l'IP ou l'email a épuisé ses tentatives."""
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = auth_ip_bucket.hit(f"ip:{client_ip(request)}")
+    if not retry_after:
+        retry_after = auth_email_bucket.hit(f"email:{email.lower()}")
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives, réessayez plus tard",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -0,0 +1,130 @@
+"""« Les clients ont aussi acheté » : co-occurrences des produits dans les commandes payées.
+
+La table creuse `product_cooccurrences` est tenue à jour à chaque passage d'une commande en 'paid'
+(`record_paid_order`) ; `rebuild_all` la recalcule entièrement en parcourant `order_items` en flux.
+Les top-K par produit sont gardés en mémoire (cache "recommendations", invalidé entre workers) :
+une lecture de recommandations ne fait aucune agrégation SQL.
+"""
+import os
+from collections import Counter
+from itertools import permutations
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.db.database import SessionLocal
+from src.models.order import Order, OrderItem
+from src.models.recommendation import ProductCooccurrence
+from src.services.cache import register_cache
+from src.services.invalidation import invalidate_on_commit
+from src.services.warmup import warmup
+
+
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "10"))
+RECOMMENDATIONS_REBUILD_CHUNK_SIZE = int(os.getenv("RECOMMENDATIONS_REBUILD_CHUNK_SIZE", "5000"))
+
+# Pas d'expiration utile : chaque mise à jour de la table invalide les produits concernés
+recommendation_cache = register_cache("recommendations", ttl_seconds=24 * 3600, max_entries=100_000)
+
+
+def record_paid_order(db: Session, product_ids: set[int]) -> None:
+    """Incrémente les paires de produits d'une commande qui vient d'être payée (sans commit)."""
+    if len(product_ids) < 2:
+        return
+    # Ordre stable des upserts : deux paiements concurrents verrouillent les lignes dans le même ordre
+    rows = [{"product_id": a, "other_product_id": b, "count": 1} for a, b in sorted(permutations(product_ids, 2))]
+    stmt = pg_insert(ProductCooccurrence).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductCooccurrence.product_id, ProductCooccurrence.other_product_id],
+        set_={"count": ProductCooccurrence.count + 1},
+    )
+    db.execute(stmt)
+    invalidate_on_commit(db, [("recommendations", pid) for pid in product_ids])
+
+
+def top_k(db: Session, product_id: int) -> list[int]:
+    """Identifiants des produits les plus souvent achetés avec `product_id`, du plus fréquent au moins fréquent."""
+    cached = recommendation_cache.get(product_id)
+    if cached is not None:
+        return cached
+    ids = list(
+        db.execute(
+            select(ProductCooccurrence.other_product_id)
+            .where(ProductCooccurrence.product_id == product_id)
+            .order_by(ProductCooccurrence.count.desc(), ProductCooccurrence.other_product_id)
+            .limit(RECOMMENDATIONS_TOP_K)
+        ).scalars()
+    )
+    recommendation_cache.set(product_id, ids)
+    return ids
+
+
+def warm(db: Session) -> int:
+    """Charge en une requête le top-K de tous les produits ; renvoie le nombre de produits chargés."""
+    ranked = select(
+        ProductCooccurrence.product_id,
+        ProductCooccurrence.other_product_id,
+        func.row_number()
+        .over(
+            partition_by=ProductCooccurrence.product_id,
+            order_by=(ProductCooccurrence.count.desc(), ProductCooccurrence.other_product_id),
+        )
+        .label("rank"),
+    ).subquery()
+    stmt = (
+        select(ranked.c.product_id, ranked.c.other_product_id)
+        .where(ranked.c.rank <= RECOMMENDATIONS_TOP_K)
+        .order_by(ranked.c.product_id, ranked.c.rank)
+    )
+    lists: dict[int, list[int]] = {}
+    for product_id, other_id in db.execute(stmt):
+        lists.setdefault(product_id, []).append(other_id)
+    for product_id, ids in lists.items():
+        recommendation_cache.set(product_id, ids)
+    return len(lists)
+
+
+def _warm_cache() -> int:
+    with SessionLocal() as db:
+        return warm(db)
+
+
+def rebuild_all(db: Session, chunk_size: int = RECOMMENDATIONS_REBUILD_CHUNK_SIZE) -> int:
+    """Recalcule toute la table à partir des commandes payées (sans commit) ; renvoie le nombre de paires.
+
+    Les lignes `order_items` sont lues par curseur serveur, triées par commande : la mémoire utilisée
+    dépend du nombre de paires distinctes, pas du nombre de commandes. À exécuter en REPEATABLE READ :
+    un paiement concurrent provoque alors une erreur de sérialisation (à relancer) plutôt qu'une perte.
+    """
+    counts: Counter[tuple[int, int]] = Counter()
+    stmt = (
+        select(OrderItem.order_id, OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.status == "paid")
+        .order_by(OrderItem.order_id)
+        .execution_options(yield_per=chunk_size)
+    )
+    current_order, products = None, set()
+    for order_id, product_id in db.execute(stmt):
+        if order_id != current_order:
+            counts.update(permutations(products, 2))
+            current_order, products = order_id, set()
+        products.add(product_id)
+    counts.update(permutations(products, 2))
+
+    db.execute(delete(ProductCooccurrence))
+    batch = []
+    for (a, b), count in counts.items():
+        batch.append({"product_id": a, "other_product_id": b, "count": count})
+        if len(batch) >= chunk_size:
+            db.execute(insert(ProductCooccurrence), batch)
+            batch = []
+    if batch:
+        db.execute(insert(ProductCooccurrence), batch)
+    invalidate_on_commit(db, [("recommendations", None)])
+    return len(counts)
+
+
+# Optionnelle : sans cache, les recommandations sont lues produit par produit
+warmup.register_step("recommendations", _warm_cache, required=False, replicas=True)
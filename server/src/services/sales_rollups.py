@@ -0,0 +1,84 @@
+"""Agrégats de ventes journaliers (`daily_product_sales`), tenus à jour à chaque création / paiement de commande.
+
+Les tableaux de bord ne lisent que ces agrégats : leur coût dépend du nombre de jours et de produits
+demandés, pas du volume de commandes. `backfill_range` les recalcule à partir de l'historique.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, cast, delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.models.order import Order, OrderItem
+from src.models.sales import DailyProductSales
+
+
+def _increment(db: Session, day: date, deltas: dict[int, dict[str, int]]) -> None:
+    if not deltas:
+        return
+    rows = [
+        {
+            "date": day,
+            "product_id": product_id,
+            "ordered_units": delta.get("ordered_units", 0),
+            "units": delta.get("units", 0),
+            "revenue_cents": delta.get("revenue_cents", 0),
+        }
+        for product_id, delta in sorted(deltas.items())
+    ]
+    stmt = pg_insert(DailyProductSales).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyProductSales.date, DailyProductSales.product_id],
+        set_={
+            "ordered_units": DailyProductSales.ordered_units + stmt.excluded.ordered_units,
+            "units": DailyProductSales.units + stmt.excluded.units,
+            "revenue_cents": DailyProductSales.revenue_cents + stmt.excluded.revenue_cents,
+        },
+    )
+    db.execute(stmt)
+
+
+def record_order_created(db: Session, created_at: datetime, items: list[OrderItem]) -> None:
+    deltas: dict[int, dict[str, int]] = defaultdict(lambda: {"ordered_units": 0})
+    for item in items:
+        deltas[item.product_id]["ordered_units"] += 1
+    _increment(db, created_at.date(), deltas)
+
+
+def record_order_paid(db: Session, order: Order) -> None:
+    deltas: dict[int, dict[str, int]] = defaultdict(lambda: {"units": 0, "revenue_cents": 0})
+    for item in order.items:
+        deltas[item.product_id]["units"] += 1
+        deltas[item.product_id]["revenue_cents"] += item.price_cents
+    _increment(db, order.created_at.date(), deltas)
+
+
+def backfill_range(db: Session, start: date, end: date) -> int:
+    """Recalcule les agrégats des jours [start, end] (sans commit) ; renvoie le nombre de lignes écrites.
+
+    À exécuter en REPEATABLE READ, par petites plages : une écriture concurrente sur ces jours
+    fait échouer la transaction (à relancer) au lieu d'être écrasée.
+    """
+    day = cast(Order.created_at, Date)
+    paid = Order.status == "paid"
+    aggregated = (
+        select(
+            day.label("date"),
+            OrderItem.product_id,
+            func.count().label("ordered_units"),
+            func.count().filter(paid).label("units"),
+            func.coalesce(func.sum(OrderItem.price_cents).filter(paid), literal(0)).label("revenue_cents"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.created_at >= start, Order.created_at < end + timedelta(days=1))
+        .group_by(day, OrderItem.product_id)
+    )
+    db.execute(delete(DailyProductSales).where(DailyProductSales.date >= start, DailyProductSales.date <= end))
+    result = db.execute(
+        insert(DailyProductSales).from_select(
+            ["date", "product_id", "ordered_units", "units", "revenue_cents"],
+            aggregated,
+        )
+    )
+    return result.rowcount
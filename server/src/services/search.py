@@ -0,0 +1,152 @@
+"""Suggestions de titres « à la frappe », tolérantes aux fautes, servies depuis un index en mémoire.
+
+Les titres sont normalisés (minuscules, sans accents ni ponctuation) et découpés en mots. La recherche
+floue se fait sur le vocabulaire (mots distincts, bien moins nombreux que les titres) grâce à un index
+trigrammes à la manière de pg_trgm ; chaque mot renvoie ensuite aux titres qui le contiennent.
+- le dernier mot tapé est traité comme un préfixe (saisie en cours) : "decroch" → « Décrochez… » ;
+- une faute de frappe reste reconnue par similarité de trigrammes : "altrenance" → « …alternance » ;
+- un titre doit correspondre à chaque mot reconnu de la requête.
+"""
+import bisect
+import heapq
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Generic, Iterable, TypeVar
+
+
+SUGGEST_MIN_SIMILARITY = float(os.getenv("SUGGEST_MIN_SIMILARITY", "0.35"))
+MAX_WORD_MATCHES = 20  # mots du vocabulaire retenus par mot de requête
+EXACT, PREFIX = 1.0, 0.9  # une correspondance exacte ou par préfixe passe avant toute correspondance floue
+FUZZY_WEIGHT = 0.8
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+T = TypeVar("T")
+
+
+def normalize(text: str) -> list[str]:
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).split()
+
+
+def trigrams(word: str, partial: bool = False) -> set[str]:
+    """Trigrammes d'un mot ; `partial` : mot en cours de saisie (pas de trigramme de fin de mot)."""
+    padded = f"  {word}" if partial else f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex(Generic[T]):
+    """Index des titres ; `T` est la valeur renvoyée pour chaque titre trouvé."""
+
+    def __init__(self, entries: Iterable[tuple[str, T]]) -> None:
+        self._values: list[T] = []
+        self._titles: list[tuple[int, ...]] = []  # ids des mots de chaque titre
+        word_ids: dict[str, int] = {}
+        word_titles: list[list[int]] = []
+        for position, (title, value) in enumerate(entries):
+            ids = []
+            for word in dict.fromkeys(normalize(title)):
+                word_id = word_ids.setdefault(word, len(word_ids))
+                if word_id == len(word_titles):
+                    word_titles.append([])
+                word_titles[word_id].append(position)
+                ids.append(word_id)
+            self._values.append(value)
+            self._titles.append(tuple(ids))
+
+        self._words = list(word_ids)
+        self._word_index = word_ids
+        # Titres de chaque mot, les plus courts d'abord : ordre de parcours des recherches très larges
+        self._word_titles = [tuple(sorted(t, key=lambda p: len(self._titles[p]))) for t in word_titles]
+        self._sorted_words = sorted(self._words)
+        self._gram_counts = []
+        postings: dict[str, list[int]] = {}
+        for word_id, word in enumerate(self._words):
+            grams = trigrams(word)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(word_id)
+        self._postings = {gram: tuple(ids) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _prefix_matches(self, prefix: str) -> dict[int, float]:
+        start = bisect.bisect_left(self._sorted_words, prefix)
+        end = bisect.bisect_left(self._sorted_words, prefix + "\uffff", start)
+        words = self._sorted_words[start:end]
+        if len(words) > MAX_WORD_MATCHES:
+            # Préfixe très court : on garde les mots présents dans le plus de titres
+            words = heapq.nlargest(MAX_WORD_MATCHES, words, key=lambda w: len(self._word_titles[self._word_index[w]]))
+        return {self._word_index[w]: EXACT if w == prefix else PREFIX for w in words}
+
+    def _fuzzy_matches(self, word: str, partial: bool) -> dict[int, float]:
+        grams = trigrams(word, partial)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids:
+                shared.update(ids)  # comptage en C
+        # Similarité ≤ trigrammes partagés / trigrammes de la requête : élimine d'emblée les mots trop éloignés
+        min_shared = SUGGEST_MIN_SIMILARITY * len(grams)
+        matches = {}
+        for word_id, count in [item for item in shared.items() if item[1] >= min_shared]:
+            if partial:
+                # Saisie en cours : part de ce qui est tapé présente dans le mot
+                similarity = count / len(grams)
+            else:
+                similarity = count / (len(grams) + self._gram_counts[word_id] - count)
+            if similarity >= SUGGEST_MIN_SIMILARITY:
+                matches[word_id] = similarity * FUZZY_WEIGHT
+        return dict(heapq.nlargest(MAX_WORD_MATCHES, matches.items(), key=lambda item: item[1]))
+
+    def _matches(self, word: str, partial: bool) -> dict[int, float]:
+        matches = self._fuzzy_matches(word, partial) if len(word) >= 3 else {}
+        exact = self._word_index.get(word)
+        if exact is not None:
+            matches[exact] = EXACT
+        if partial:
+            matches.update(self._prefix_matches(word))
+        return matches
+
+    def search(self, query: str, limit: int = 8) -> list[T]:
+        words = normalize(query)
+        if not words:
+            return []
+        partial_last = not query[-1:].isspace()
+        per_word = [self._matches(w, partial_last and i == len(words) - 1) for i, w in enumerate(words)]
+        per_word = [m for m in per_word if m]  # un mot que rien ne reconnaît n'élimine pas tout
+        if not per_word:
+            return []
+
+        # Parcours des titres du mot de requête le plus sélectif (meilleures correspondances et titres courts
+        # d'abord), en ne gardant que ceux qui contiennent aussi un mot reconnu pour chaque autre mot de requête
+        per_word.sort(key=lambda matches: sum(len(self._word_titles[w]) for w in matches))
+        first, others = per_word[0], per_word[1:]
+        cap = limit * 4
+        candidates: list[int] = []
+        seen: set[int] = set()
+        for word_id, _ in sorted(first.items(), key=lambda item: -item[1]):
+            for position in self._word_titles[word_id]:
+                if position in seen:
+                    continue
+                seen.add(position)
+                title = self._titles[position]
+                if all(not matches.keys().isdisjoint(title) for matches in others):
+                    candidates.append(position)
+                    if len(candidates) >= cap:
+                        break
+            if len(candidates) >= cap:
+                break
+
+        scored = []
+        for position in candidates:
+            title = self._titles[position]
+            score = sum(max(matches.get(w, 0.0) for w in title) for matches in per_word)
+            scored.append((score, -len(title), -position, position))
+        return [self._values[item[3]] for item in heapq.nlargest(limit, scored)]
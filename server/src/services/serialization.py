@@ -0,0 +1,22 @@
+"""Réponses JSON encodées directement, sans revalidation, pour les données que l'API construit elle-même.
+
+Avec un `response_model`, FastAPI revalide la valeur renvoyée par la route (copie complète de chaque
+modèle) avant de la sérialiser. Quand la valeur est déjà une instance du bon modèle (catalogue en
+cache, commandes converties par la route), on l'encode avec un `TypeAdapter` compilé une fois et on
+renvoie les octets : FastAPI ne touche plus à une `Response`. Le `response_model` reste déclaré pour
+la documentation OpenAPI.
+"""
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    """Corps JSON déjà encodé (bytes)."""
+
+    media_type = "application/json"
+
+
+def trusted_json(adapter: TypeAdapter[Any], value: Any, status_code: int = 200) -> JSONBytesResponse:
+    return JSONBytesResponse(adapter.dump_json(value), status_code=status_code)
@@ -0,0 +1,243 @@
+"""Stockage des fichiers (PDF, extraits, couvertures) : disque local ou bucket compatible S3.
+
+Les clés sont celles de `Product.file_key` (ex. "ebooks/decrochez-votre-alternance.pdf").
+- LocalStorage : fichiers sous server/media/, servis par le montage /static.
+- S3Storage : bucket S3/R2/MinIO ; téléchargements par URL présignée, et cache disque LRU borné
+  pour les lectures côté serveur (extraction d'extraits), avec un seul téléchargement par clé
+  même si plusieurs threads la demandent en même temps.
+"""
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except Exception:  # pragma: no cover
+    boto3 = None
+
+
+MEDIA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "media")
+
+STORAGE_BUCKET_URL = os.getenv("STORAGE_BUCKET_URL", "")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3" if STORAGE_BUCKET_URL else "local")  # local | s3
+STORAGE_ACCESS_KEY = os.getenv("STORAGE_ACCESS_KEY", "")
+STORAGE_SECRET_KEY = os.getenv("STORAGE_SECRET_KEY", "")
+STORAGE_REGION = os.getenv("STORAGE_REGION", "auto")
+# URL publique (CDN, bucket public) pour les couvertures ; à défaut, URL directe du bucket
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", "")
+STORAGE_PRESIGN_SECONDS = int(os.getenv("STORAGE_PRESIGN_SECONDS", "300"))
+STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ebook-storage-cache"))
+STORAGE_CACHE_MAX_BYTES = int(os.getenv("STORAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class StorageError(Exception):
+    pass
+
+
+class LocalStorage:
+    def __init__(self, root: str = MEDIA_DIR) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Clé invalide : {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def write(self, key: str, data: bytes, content_type: str | None = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def local_path(self, key: str) -> str:
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise StorageError(f"Fichier introuvable : {key}")
+        return path
+
+    def download_url(self, key: str, expires_in: int = STORAGE_PRESIGN_SECONDS) -> str:
+        # Exemple: /static/ebooks/decrochez-votre-alternance.pdf
+        return f"/static/{key}"
+
+    def public_url(self, key: str) -> str:
+        return f"/static/{key}"
+
+
+class DiskLRUCache:
+    """Cache disque borné en octets, partagé par tous les workers qui pointent sur le même répertoire.
+
+    L'occupation est mesurée sur le répertoire lui-même (et non par processus) et l'ordre LRU suit la
+    date de modification des fichiers, rafraîchie à chaque lecture : N workers restent sous `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return key.replace("/", "__")
+
+    def _files(self) -> list[tuple[float, str, int]]:
+        """(date de dernière lecture, nom, taille) des fichiers complets du répertoire."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".part"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # évincé entre-temps par un autre worker
+                    continue
+                if entry.is_file():
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        return files
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, _, size in self._files())
+
+    def get_or_fetch(self, key: str, fetch) -> str:
+        """Chemin local de `key` ; `fetch(dest_path)` n'est appelé qu'une fois par clé manquante dans ce worker."""
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        while True:
+            with self._lock:
+                try:
+                    os.utime(path)  # marque la lecture, visible des autres workers
+                    return path
+                except FileNotFoundError:
+                    pass
+                pending = self._inflight.get(name)
+                if pending is None:
+                    pending = self._inflight[name] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            if not leader:
+                # Un autre thread télécharge déjà ce fichier : on attend puis on relit le cache
+                pending.wait()
+                if os.path.isfile(path):
+                    continue
+                raise StorageError(f"Échec du téléchargement : {key}")
+            try:
+                partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+                try:
+                    fetch(partial)
+                    os.replace(partial, path)
+                except Exception:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+                    raise
+                self._evict(keep=name)
+                return path
+            finally:
+                with self._lock:
+                    self._inflight.pop(name, None)
+                pending.set()
+
+    def _evict(self, keep: str) -> None:
+        files = self._files()
+        size = sum(file_size for _, _, file_size in files)
+        for _, name, file_size in sorted(files):
+            if size <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, self._name(key)))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage:
+    """Bucket compatible S3. STORAGE_BUCKET_URL : https://<endpoint>/<bucket> ou s3://<bucket>."""
+
+    def __init__(self, bucket_url: str, access_key: str, secret_key: str, region: str, cache: DiskLRUCache) -> None:
+        if boto3 is None:
+            raise StorageError("Le backend S3 nécessite boto3 (pip install boto3)")
+        parsed = urlparse(bucket_url)
+        if parsed.scheme == "s3":
+            endpoint_url, self.bucket = None, parsed.netloc
+        else:
+            endpoint_url = f"{parsed.scheme}://{parsed.netloc}"
+            self.bucket = parsed.path.strip("/").split("/")[0]
+        if not self.bucket:
+            raise StorageError(f"Bucket absent de STORAGE_BUCKET_URL : {bucket_url}")
+        self.endpoint_url = endpoint_url
+        self.cache = cache
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=None if region == "auto" and endpoint_url is None else region,
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def write(self, key: str, data: bytes, content_type: str | None = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        self.cache.discard(key)
+
+    def local_path(self, key: str) -> str:
+        def fetch(dest: str) -> None:
+            try:
+                self.client.download_file(self.bucket, key, dest)
+            except ClientError as e:
+                raise StorageError(f"Fichier introuvable : {key}") from e
+
+        return self.cache.get_or_fetch(key, fetch)
+
+    def download_url(self, key: str, expires_in: int = STORAGE_PRESIGN_SECONDS) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    def public_url(self, key: str) -> str:
+        if STORAGE_PUBLIC_URL:
+            return f"{STORAGE_PUBLIC_URL.rstrip('/')}/{key}"
+        if self.endpoint_url:
+            return f"{self.endpoint_url}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+
+def create_storage():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(
+            STORAGE_BUCKET_URL,
+            STORAGE_ACCESS_KEY,
+            STORAGE_SECRET_KEY,
+            STORAGE_REGION,
+            DiskLRUCache(STORAGE_CACHE_DIR, STORAGE_CACHE_MAX_BYTES),
+        )
+    return LocalStorage()
+
+
+storage = create_storage()
@@ -0,0 +1,18 @@
+"""Configuration du client Stripe, partagée par les routes de paiement et la réconciliation."""
+import os
+
+import stripe
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+# Serveur Stripe de test local (ex. stripe-mock : http://localhost:12111) ; vide = API Stripe réelle
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "")
+
+if STRIPE_SECRET_KEY:
+    stripe.api_key = STRIPE_SECRET_KEY
+if STRIPE_API_BASE:
+    stripe.api_base = STRIPE_API_BASE
@@ -0,0 +1,203 @@
+"""Démarrage à chaud : tout ce que paieraient les premières requêtes après un déploiement est fait avant.
+
+Le lifespan lance `warmup.start()` : un thread exécute les étapes enregistrées (configuration des
+mappers, ouverture de WARMUP_POOL_CONNECTIONS connexions par moteur, exécution une fois de chaque
+requête chaude pour remplir le cache de compilation, chargement des caches du catalogue…) pendant que
+/health répond déjà. GET /ready renvoie 503 tant que la préparation n'est pas terminée : la plateforme
+n'envoie le trafic qu'ensuite. Une étape en échec est journalisée et n'empêche pas les suivantes ; une
+étape requise est retentée (délai croissant) et /ready reste à 503 jusqu'à ce qu'elle réussisse.
+
+Chaque moteur (primaire, réplicas) a son propre cache de SQL compilé. Pour les étapes des routes de
+lecture (`replicas=True`), les SELECT exécutés sur le primaire sont rejoués sur chaque réplica :
+relancer l'étape ne suffirait pas, ses résultats étant déjà dans les caches applicatifs.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable
+
+import stripe
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, configure_mappers
+
+from src.db import statements
+from src.db.database import SessionLocal, engine, replica_engines
+from src.services.download_events import download_count
+from src.services.metrics import register_collector
+
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Connexions ouvertes par moteur (primaire et chaque réplica), plafonnées à la taille du pool
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "5"))
+# Délai maximal entre deux nouvelles tentatives d'une étape requise en échec
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "30"))
+
+
+class WarmUp:
+    def __init__(self) -> None:
+        self._steps: list[tuple[str, Callable[[], object], bool, bool]] = []
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        # Posé quand toutes les étapes requises ont réussi
+        self.done = threading.Event()
+        self.started_at: float | None = None
+        self.duration_ms = 0.0
+        self.steps: dict[str, dict] = {}
+
+    def register_step(
+        self, name: str, step: Callable[[], object], required: bool = True, replicas: bool = False
+    ) -> None:
+        """Ajoute une étape ; elles s'exécutent dans l'ordre d'enregistrement.
+
+        `required` : /ready attend son succès. `replicas` : ses SELECT sont rejoués sur chaque réplica.
+        """
+        self._steps.append((name, step, required, replicas))
+
+    @property
+    def failed(self) -> list[str]:
+        """Étapes requises actuellement en échec."""
+        with self._stats_lock:
+            return [name for name, result in self.steps.items() if result["status"] == "failed" and result["required"]]
+
+    def start(self) -> None:
+        if self._thread is not None or self.done.is_set():
+            return
+        if not WARMUP_ENABLED:
+            self.done.set()
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run(self) -> None:
+        self.started_at = time.time()
+        started = time.monotonic()
+        pending = self._steps
+        backoff = 1.0
+        while True:
+            for name, step, required, replicas in pending:
+                self._run_step(name, step, required, replicas)
+            failed = set(self.failed)
+            pending = [entry for entry in self._steps if entry[0] in failed]
+            if not pending:
+                break
+            if self._stop.wait(backoff):
+                return
+            backoff = min(backoff * 2, WARMUP_RETRY_MAX_SECONDS)
+        self.duration_ms = round((time.monotonic() - started) * 1000, 3)
+        self.done.set()
+
+    def _run_step(self, name: str, step: Callable[[], object], required: bool, replicas: bool) -> None:
+        step_started = time.monotonic()
+        with self._stats_lock:
+            attempts = self.steps.get(name, {}).get("attempts", 0) + 1
+        try:
+            if replicas and replica_engines:
+                with _captured_selects() as selects:
+                    value = step()
+                _replay(selects)
+            else:
+                value = step()
+            result = {"status": "ok", "result": value}
+        except Exception as e:
+            print(f"Warning: warm-up step {name} failed: {e}", file=sys.stderr)
+            result = {"status": "failed", "error": str(e)}
+        result.update(required=required, attempts=attempts)
+        result["duration_ms"] = round((time.monotonic() - step_started) * 1000, 3)
+        with self._stats_lock:
+            self.steps[name] = result
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": WARMUP_ENABLED,
+                "done": self.done.is_set(),
+                "started_at": self.started_at,
+                "duration_ms": self.duration_ms,
+                "steps": dict(self.steps),
+            }
+
+
+@contextmanager
+def _captured_selects():
+    """SELECT exécutés par les sessions de ce thread pendant le bloc : (requête, paramètres, options)."""
+    selects = []
+    thread = threading.get_ident()
+
+    def capture(state) -> None:
+        # Les chargements de relations dépendent de l'état de la session d'origine : non rejoués
+        if state.is_select and not state.is_relationship_load and threading.get_ident() == thread:
+            selects.append((state.statement, state.parameters, state.local_execution_options))
+
+    event.listen(Session, "do_orm_execute", capture)
+    try:
+        yield selects
+    finally:
+        event.remove(Session, "do_orm_execute", capture)
+
+
+def _replay(selects: list) -> None:
+    """Exécute chaque SELECT capturé sur chaque réplica : SQL compilé dans le cache de ce moteur.
+
+    Un réplica injoignable n'empêche pas d'être prêt : le routage des lectures l'écarte déjà.
+    """
+    for replica in replica_engines:
+        try:
+            with Session(bind=replica) as db:
+                for statement, parameters, options in selects:
+                    db.execute(statement, parameters, execution_options=options).all()
+        except Exception as e:
+            print(f"Warning: warm-up replay on replica {replica.url.host}:{replica.url.port} failed: {e}", file=sys.stderr)
+
+
+def _open_pools() -> int:
+    """Ouvre les connexions en même temps (sinon le pool réutiliserait la première) ; renvoie leur nombre."""
+    opened = 0
+    for bind in (engine, *replica_engines):
+        size = bind.pool.size() if hasattr(bind.pool, "size") else WARMUP_POOL_CONNECTIONS
+        connections = []
+        try:
+            for _ in range(min(WARMUP_POOL_CONNECTIONS, size)):
+                conn = bind.connect()
+                connections.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            for conn in connections:
+                conn.close()
+        opened += len(connections)
+    return opened
+
+
+def _hot_queries() -> int:
+    """Exécute une fois chaque requête préconstruite (ids inexistants) : SQL compilé et mis en cache."""
+    with SessionLocal() as db:
+        db.execute(statements.active_user_by_id, {"user_id": 0}).all()
+        db.execute(statements.paid_order_id_for_product, {"user_id": 0, "product_id": 0}).all()
+        db.execute(statements.product_by_id, {"product_id": 0}).all()
+        db.execute(statements.active_product_by_id, {"product_id": 0}).all()
+        download_count(db, 0, 0, since=datetime.utcnow())
+    return 5
+
+
+def _stripe() -> None:
+    # Le SDK Stripe charge ses ressources à la première utilisation
+    _ = stripe.PaymentIntent, stripe.Webhook
+
+
+warmup = WarmUp()
+warmup.register_step("mappers", configure_mappers)
+warmup.register_step("pool", _open_pools)
+warmup.register_step("hot_queries", _hot_queries)
+warmup.register_step("stripe", _stripe)
+
+register_collector("warmup", warmup.snapshot)
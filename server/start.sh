@@ -1,3 +1,9 @@
 #!/bin/sh
 # Railway injecte PORT ; ce script assure qu'il est bien utilisé
-exec uvicorn src.main:app --host 0.0.0.0 --port "${PORT:-8000}"
+# WEB_CONCURRENCY : nombre de workers, ou "auto" (défaut) pour le déduire du quota CPU comme run.py
+WORKERS=$(python -c "from run import worker_count; print(worker_count())")
+# Index manquants construits une fois, en arrière-plan (CONCURRENTLY), pendant que les workers démarrent
+python -m src.db.indexes &
+exec uvicorn src.main:app --host 0.0.0.0 --port "${PORT:-8000}" \
+    --workers "$WORKERS" \
+    --timeout-graceful-shutdown "${GRACEFUL_SHUTDOWN_SECONDS:-20}"